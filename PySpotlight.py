@@ -1,3 +1,7 @@
+import time
+
+_STARTED = time.perf_counter()
+
 import sys
 from PyQt5.QtWidgets import (
     QApplication,
@@ -13,22 +17,21 @@ from PyQt5.QtWidgets import (
     QSystemTrayIcon,
     QMenu,
 )
-from PyQt5.QtGui import QGuiApplication, QIcon, QPixmap, QPainter, QColor
+from PyQt5.QtGui import QIcon, QPixmap, QPainter, QColor
 
 from PyQt5.QtCore import Qt, pyqtSignal, QTimer
-from screeninfo import get_monitors
-from PIL import Image, ImageDraw
-from pyspotlight.appcontext import AppContext
-from pyspotlight.devices import DeviceMonitor
-from pyspotlight.spotlight import SpotlightOverlayWindow
-from pyspotlight.settingswindow import SpotlightSettingsWindow
 from pyspotlight.infoverlay import InfOverlayWindow
-from pyspotlight.utils import capture_monitor_screenshot
+from pyspotlight.utils import get_monitors, monitor_geometry, select_capture_backend
 
 import faulthandler
 
 faulthandler.enable()
 
+# Meta para o ícone da bandeja aparecer, contada do início deste módulo. O
+# resto (uinput, dispositivos, captura, overlay) sobe depois, já com o laço
+# de eventos rodando; "python -m pyspotlight.benchmark startup" confere
+TRAY_BUDGET = 0.5
+
 
 class PySpotlightApp(QMainWindow):
     log_signal = pyqtSignal(str)
@@ -42,36 +45,62 @@ class PySpotlightApp(QMainWindow):
 
         self.tray_icon = None
         self.create_tray_icon()
+        self.tray_ready = time.perf_counter() - _STARTED
 
         # Quando fechar a janela, ao invés de fechar, esconder
         self.setWindowFlags(self.windowFlags() | Qt.WindowMinimizeButtonHint)
         self.setMinimumSize(400, 300)
 
         self.running = True
-        self.icon = None
         self.log_signal.connect(self.append_log)
         self.info_signal.connect(self.show_info)
 
+        self.ctx = None
+        self.device_monitor = None
+        self.info_overlay = None
+        self.init_ui()
+        QTimer.singleShot(0, self.start_services)
+
+    def start_services(self):
+        from pyspotlight.appcontext import AppContext
+        from pyspotlight.devices import DeviceMonitor
+
         self.ctx = AppContext(
             selected_screen=0,
             log_function=self.thread_safe_log,
             show_info_function=self.thread_save_info,
         )
         self.create_overlay()
-        # self.spotlight_window = SpotlightOverlayWindow(self.ctx)
         self.device_monitor = DeviceMonitor(self.ctx)
 
-        self.info_overlay = None
         # if len(QGuiApplication.screens()) >= 1:
         self.setup_info_overlay()
 
-        self.init_ui()
+        name = select_capture_backend(log=self.append_log, benchmark=False)
+        if name is None:
+            # Primeira vez com estes monitores: mede depois da partida
+            QTimer.singleShot(0, self.benchmark_capture_backends)
+        else:
+            self.ctx.capture_backend = name
         self.refresh_screens()
         self.device_monitor.start_monitoring()
         self.refresh_devices_signal.connect(self.refresh_devices_combo)
         self.device_monitor.register_hotplug_callback(self.emit_refresh_devices_signal)
         self.refresh_devices_combo()
 
+        ready = time.perf_counter() - _STARTED
+        self.append_log(
+            f"* Bandeja em {self.tray_ready * 1e3:.0f} ms, "
+            f"pronto em {ready * 1e3:.0f} ms"
+        )
+        if self.tray_ready > TRAY_BUDGET:
+            self.append_log(
+                f"* Bandeja acima da meta de {TRAY_BUDGET * 1e3:.0f} ms na partida"
+            )
+
+    def benchmark_capture_backends(self):
+        self.ctx.capture_backend = select_capture_backend(log=self.append_log)
+
     def emit_refresh_devices_signal(self):
         self.refresh_devices_signal.emit()
 
@@ -153,15 +182,16 @@ class PySpotlightApp(QMainWindow):
             self.device_combo.addItem(label, userData=dev)
 
     def create_overlay(self):
+        from pyspotlight.spotlight import SpotlightOverlayWindow
+
         screen_index = self.ctx.selected_screen
-        screenshot, geometry = capture_monitor_screenshot(screen_index)
+        geometry = monitor_geometry(screen_index)
         if self.ctx.overlay_window:
             self.ctx.overlay_window.monitor_index = screen_index
             self.ctx.overlay_window.setGeometry(geometry)
         else:
             self.ctx.overlay_window = SpotlightOverlayWindow(
                 context=self.ctx,
-                screenshot=screenshot,
                 screen_geometry=geometry,
                 monitor_index=screen_index,
             )
@@ -170,12 +200,12 @@ class PySpotlightApp(QMainWindow):
 
     def setup_info_overlay(self):
         # Pega o monitor que não está sendo usado pelo spotlight
-        all_screens = QGuiApplication.screens()
+        all_screens = get_monitors()
         target_index = 0
         if len(all_screens) > 1:
             target_index = 1 if self.ctx.selected_screen == 0 else 0
 
-        geometry = all_screens[target_index].geometry()
+        geometry = monitor_geometry(target_index)
         if self.info_overlay:
             self.info_overlay.setGeometry(geometry)
         self.info_overlay = InfOverlayWindow(geometry)
@@ -205,6 +235,10 @@ class PySpotlightApp(QMainWindow):
         self.log_text.append(message)
 
     def open_settings(self):
+        if self.ctx is None:
+            return  # ainda iniciando
+        from pyspotlight.settingswindow import SpotlightSettingsWindow
+
         self.settings_window = SpotlightSettingsWindow(self.ctx)
         self.settings_window.show()
 
@@ -227,6 +261,8 @@ class PySpotlightApp(QMainWindow):
             self.screen_combo.setCurrentIndex(current_index)
 
     def update_selected_screen(self):
+        if self.ctx is None:
+            return
         idx = self.screen_combo.currentIndex()
         self.ctx.selected_screen = idx
         self.create_overlay()
@@ -281,17 +317,13 @@ class PySpotlightApp(QMainWindow):
 
         self.tray_icon.show()
 
-    def create_image(self):
-        image = Image.new("RGB", (64, 64), "black")
-        draw = ImageDraw.Draw(image)
-        draw.ellipse((16, 16, 48, 48), fill="lime")
-        return image
-
     def exit_app(self):
         self.running = False
-        if self.icon:
-            self.icon.stop()
-        self.save_config()
+        if self.ctx is not None:
+            self.save_config()
+            self.ctx.stop_capture_service()
+            self.ctx.stop_reactor()
+            self.ctx.stop_scheduler()
         QApplication.quit()
 
 
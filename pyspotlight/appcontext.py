@@ -1,5 +1,11 @@
 import uinput
 
+from .devicecache import IdentityCache
+from .performance import PerformanceSettings
+from .reactor import IOReactor
+from .scheduler import Scheduler
+from .utils import MODE_PEN
+
 
 class AppContext:
     def __init__(
@@ -17,6 +23,14 @@ class AppContext:
         self._support_auto_mode = False
 
         self._active_device = None
+        self._capture_service = None
+        self._capture_backend = "mss"
+        self._reactor = None
+        self._scheduler = None
+        self._performance = None
+        self._device_cache = None
+        self.input_jitter = None  # atraso evento → leitura, se configurado
+        self._devices = []  # dispositivos monitorados, avisados do overlay
 
         self._ui = uinput.Device(
             [
@@ -46,6 +60,82 @@ class AppContext:
     def ui(self, uid):
         self._ui = uid
 
+    @property
+    def reactor(self):
+        # Thread única de E/S para todos os dispositivos e o hotplug
+        if self._reactor is None:
+            self.input_jitter = self.performance.jitter_stats("entrada", self.log)
+            self._reactor = IOReactor(
+                log_function=self.log, thread_setup=self._input_thread_setup
+            )
+            self._reactor.start()
+        return self._reactor
+
+    def stop_reactor(self):
+        if self._reactor is not None:
+            self._reactor.stop()
+            self._reactor = None
+
+    @property
+    def scheduler(self):
+        # Thread única para todos os temporizadores de gestos
+        if self._scheduler is None:
+            self._scheduler = Scheduler(
+                log_function=self.log, thread_setup=self._input_thread_setup
+            )
+            self._scheduler.jitter = self.performance.jitter_stats("timers", self.log)
+            self._scheduler.start()
+        return self._scheduler
+
+    @property
+    def performance(self):
+        # [Performance] do config.ini, lido uma vez
+        if self._performance is None:
+            self._performance = PerformanceSettings.load(log=self.log)
+        return self._performance
+
+    @property
+    def device_cache(self):
+        # Identidades dos nós /dev da execução anterior (ver devicecache.py)
+        if self._device_cache is None:
+            self._device_cache = IdentityCache(log=self.log)
+        return self._device_cache
+
+    def _input_thread_setup(self):
+        # Roda dentro das threads do reator e dos timers, ao iniciarem
+        self.performance.apply(self.log)
+
+    def stop_scheduler(self):
+        if self._scheduler is not None:
+            self._scheduler.stop()
+            self._scheduler = None
+
+    @property
+    def capture_service(self):
+        # Processo de captura iniciado sob demanda, na primeira captura
+        if self._capture_service is None:
+            from .capture import CaptureService
+
+            self._capture_service = CaptureService(
+                backend_name=self._capture_backend, log_function=self.log
+            )
+        return self._capture_service
+
+    @property
+    def capture_backend(self):
+        return self._capture_backend
+
+    @capture_backend.setter
+    def capture_backend(self, name):
+        if name != self._capture_backend:
+            self._capture_backend = name
+            self.stop_capture_service()  # reinicia com o novo backend
+
+    def stop_capture_service(self):
+        if self._capture_service is not None:
+            self._capture_service.stop()
+            self._capture_service = None
+
     @property
     def support_auto_mode(self):
         return self._support_auto_mode
@@ -94,6 +184,40 @@ class AppContext:
     def show_info_function(self, func):
         self._show_info_function = func
 
+    def register_device(self, device):
+        if device not in self._devices:
+            self._devices.append(device)
+
+    def unregister_device(self, device):
+        if device in self._devices:
+            self._devices.remove(device)
+            if self._overlay_window is not None:
+                self._overlay_window.post("drop_pointer", device.pointer_id)
+
+    def primary_pointer(self):
+        # O primeiro dispositivo conectado segue o cursor do sistema; os
+        # demais têm ponteiro próprio no overlay
+        devices = self._devices
+        return devices[0].pointer_id if devices else None
+
+    def compatible_modes_for(self, pointer_id):
+        primary = self.primary_pointer()
+        if pointer_id is None:
+            pointer_id = primary
+        modes = self._compatible_modes
+        for device in self._devices:
+            if device.pointer_id == pointer_id and device.COMPATIBLE_MODES:
+                modes = device.COMPATIBLE_MODES
+                break
+        if pointer_id != primary:
+            # A tinta segue o mouse do sistema, que é do ponteiro primário
+            modes = [mode for mode in modes if mode != MODE_PEN]
+        return modes
+
+    def overlay_state_changed(self):
+        for device in list(self._devices):
+            device.update_grab()
+
     def set_active_device(self, device):
         if self._active_device == device:
             return
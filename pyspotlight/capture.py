@@ -0,0 +1,275 @@
+import itertools
+import threading
+import multiprocessing
+from multiprocessing import shared_memory
+
+from PyQt5.QtCore import QObject, QRect, QTimer, pyqtSignal
+from PyQt5.QtGui import QImage, QPixmap
+
+from .captureworker import BYTES_PER_PIXEL, capture_worker_main
+from .slides import perceptual_hash
+from .utils import QtCaptureBackend
+
+
+class CaptureError(Exception):
+    pass
+
+
+def pixmap_hash(pixmap):
+    # Hash perceptual de um pixmap já na GUI (ex.: a captura do overlay)
+    image = pixmap.toImage()
+    if image.format() != QImage.Format_RGB32:
+        image = image.convertToFormat(QImage.Format_RGB32)
+    data = image.constBits().asstring(image.sizeInBytes())
+    return perceptual_hash(image.width(), image.height(), data, image.bytesPerLine())
+
+
+class CaptureFrame:
+    def __init__(self, service, shm, slot, offset, width, height, geometry):
+        self._service = service
+        self._shm = shm
+        self.slot = slot
+        self.offset = offset
+        self.width = width
+        self.height = height
+        self.geometry = geometry
+        self._released = False
+
+    def to_pixmap(self):
+        # Único trabalho feito na thread da GUI: o upload do frame para QPixmap
+        if self._released:
+            raise CaptureError("Frame já liberado")
+        stride = self.width * BYTES_PER_PIXEL
+        view = self._shm.buf[self.offset : self.offset + stride * self.height]
+        try:
+            image = QImage(view, self.width, self.height, stride, QImage.Format_RGB32)
+            pixmap = QPixmap.fromImage(image)
+            del image
+        finally:
+            view.release()
+        return pixmap
+
+    def perceptual_hash(self):
+        # Direto da memória compartilhada, sem passar por QPixmap
+        if self._released:
+            raise CaptureError("Frame já liberado")
+        stride = self.width * BYTES_PER_PIXEL
+        view = self._shm.buf[self.offset : self.offset + stride * self.height]
+        try:
+            return perceptual_hash(self.width, self.height, view)
+        finally:
+            view.release()
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._service.release_slot(self.slot)
+
+
+class QtCaptureFrame:
+    # Frame do backend "qt", capturado na própria thread da GUI
+    def __init__(self, pixmap, geometry):
+        self._pixmap = pixmap
+        self.width = pixmap.width()
+        self.height = pixmap.height()
+        self.geometry = geometry
+
+    def to_pixmap(self):
+        return self._pixmap
+
+    def perceptual_hash(self):
+        return pixmap_hash(self._pixmap)
+
+    def release(self):
+        pass
+
+
+class CaptureFuture:
+    def __init__(self, request_id):
+        self.request_id = request_id
+        self._event = threading.Event()
+        self._frame = None
+        self._error = None
+        self._callbacks = []
+
+    def done(self):
+        return self._event.is_set()
+
+    def result(self, timeout=None):
+        if not self._event.wait(timeout):
+            raise TimeoutError(f"Captura {self.request_id} não concluída")
+        if self._error is not None:
+            raise CaptureError(self._error)
+        return self._frame
+
+    def exception(self):
+        return CaptureError(self._error) if self._error is not None else None
+
+    def add_done_callback(self, fn):
+        # Callbacks sempre executam na thread da GUI (via sinal frame_ready)
+        if self._callbacks is None:
+            fn(self)
+        else:
+            self._callbacks.append(fn)
+
+    def _set(self, frame=None, error=None):
+        self._frame = frame
+        self._error = error
+        self._event.set()
+
+    def _run_callbacks(self):
+        callbacks, self._callbacks = self._callbacks, None
+        for fn in callbacks:
+            fn(self)
+
+
+class CaptureService(QObject):
+    frame_ready = pyqtSignal(object)
+
+    def __init__(self, backend_name="mss", log_function=None):
+        super().__init__()
+        self._log = log_function
+        self._backend_name = backend_name
+        self._qt_backend = None
+        self._futures = {}
+        self._shm = {}
+        self._ids = itertools.count(1)
+        self._send_lock = threading.Lock()
+        self._process = None
+        self._listener = None
+
+        self.frame_ready.connect(self._on_frame_ready)
+        if backend_name == QtCaptureBackend.NAME:
+            return  # captura na thread da GUI: sem processo nem listener
+
+        ctx = multiprocessing.get_context("spawn")
+        # Pipe(duplex=False) devolve (leitura, escrita)
+        worker_requests, self._requests = ctx.Pipe(duplex=False)
+        self._responses, worker_responses = ctx.Pipe(duplex=False)
+        self._process = ctx.Process(
+            target=capture_worker_main,
+            args=(worker_requests, worker_responses, backend_name),
+            daemon=True,
+            name="pyspotlight-capture",
+        )
+        self._process.start()
+
+        self._listener = threading.Thread(target=self._listen, daemon=True)
+        self._listener.start()
+
+    def request(self, monitor_index, delay=0.0):
+        future = CaptureFuture(next(self._ids))
+        if self._backend_name == QtCaptureBackend.NAME:
+            # QScreen.grabWindow só funciona na thread da GUI
+            QTimer.singleShot(
+                int(delay * 1000), lambda: self._grab_qt(future, monitor_index)
+            )
+            return future
+        self._futures[future.request_id] = future
+        self._send(("grab", future.request_id, monitor_index, delay))
+        return future
+
+    def request_hash(self, monitor_index, delay=0.0):
+        # Hash perceptual da tela, calculado fora da thread da GUI
+        future = CaptureFuture(next(self._ids))
+        if self._backend_name == QtCaptureBackend.NAME:
+            QTimer.singleShot(
+                int(delay * 1000), lambda: self._hash_qt(future, monitor_index)
+            )
+            return future
+        self._futures[future.request_id] = future
+        self._send(("hash", future.request_id, monitor_index, delay))
+        return future
+
+    def _hash_qt(self, future, monitor_index):
+        if self._qt_backend is None:
+            self._qt_backend = QtCaptureBackend()
+        try:
+            width, height, data = self._qt_backend.grab(monitor_index)
+            future._set(frame=perceptual_hash(width, height, data))
+        except Exception as e:
+            future._set(error=str(e))
+        self._on_frame_ready(future)
+
+    def _grab_qt(self, future, monitor_index):
+        if self._qt_backend is None:
+            self._qt_backend = QtCaptureBackend()
+        try:
+            m = self._qt_backend.monitor(monitor_index)
+            pixmap = QPixmap.fromImage(self._qt_backend.grab_qimage(monitor_index))
+            future._set(
+                frame=QtCaptureFrame(pixmap, QRect(m.x, m.y, m.width, m.height))
+            )
+        except Exception as e:
+            future._set(error=str(e))
+        self._on_frame_ready(future)
+
+    def release_slot(self, slot):
+        self._send(("release", slot))
+
+    def stop(self):
+        if self._process is None:
+            return
+        try:
+            self._send(("stop",))
+        except (BrokenPipeError, OSError):
+            pass
+        self._process.join(timeout=1)
+        for shm in self._shm.values():
+            shm.close()
+        self._shm.clear()
+
+    def _send(self, msg):
+        with self._send_lock:
+            self._requests.send(msg)
+
+    def _attach(self, name):
+        shm = self._shm.get(name)
+        if shm is None:
+            # O processo de captura recriou o buffer (monitor maior)
+            for old in self._shm.values():
+                old.close()
+            self._shm.clear()
+            # Quem cria e remove o segmento é o processo de captura (que
+            # compartilha o resource_tracker com este processo)
+            shm = shared_memory.SharedMemory(name=name)
+            self._shm[name] = shm
+        return shm
+
+    def _listen(self):
+        while True:
+            try:
+                msg = self._responses.recv()
+            except (EOFError, OSError):
+                return
+            future = self._futures.pop(msg[1], None)
+            if future is None:
+                continue
+            if msg[0] == "hash":
+                future._set(frame=msg[2])
+            elif msg[0] == "frame":
+                _, _, name, slot, offset, width, height, (x, y, w, h) = msg
+                frame = CaptureFrame(
+                    self,
+                    self._attach(name),
+                    slot,
+                    offset,
+                    width,
+                    height,
+                    QRect(x, y, w, h),
+                )
+                future._set(frame=frame)
+            else:
+                future._set(error=msg[2])
+            self.frame_ready.emit(future)
+
+    def _on_frame_ready(self, future):
+        try:
+            future._run_callbacks()
+        except Exception as e:
+            if self._log:
+                self._log(f"[ERRO] Falha ao processar captura: {e}")
+        finally:
+            # Slot volta para o processo de captura assim que a GUI terminou
+            if isinstance(future._frame, CaptureFrame):
+                future._frame.release()
@@ -0,0 +1,119 @@
+# captureworker.py
+#
+# Processo de captura: roda fora do processo da GUI para que grab e conversão
+# não disputem o GIL com o encaminhamento de eventos nem com o paint do Qt.
+# Não criar objetos Qt aqui (o backend "qt" fica no processo da GUI).
+
+import time
+from multiprocessing import shared_memory
+
+SLOT_COUNT = 2
+BYTES_PER_PIXEL = 4
+
+
+def _frame_size(monitors):
+    largest = max(m.width * m.height for m in monitors)
+    return largest * BYTES_PER_PIXEL
+
+
+def _open_backend(name):
+    from .utils import MssCaptureBackend, create_capture_backend
+
+    try:
+        return create_capture_backend(name)
+    except Exception:
+        return MssCaptureBackend()
+
+
+def capture_worker_main(requests, responses, backend_name="mss"):
+    backend = _open_backend(backend_name)
+    shm = None
+    slot_size = 0
+    busy = set()
+    next_slot = 0
+    pending = []
+
+    def handle(msg):
+        match msg[0]:
+            case "release":
+                busy.discard(msg[1])
+            case "grab" | "hash":
+                pending.append(msg)
+            case "stop":
+                return False
+        return True
+
+    try:
+        running = True
+        while running:
+            if not pending or len(busy) == SLOT_COUNT:
+                running = handle(requests.recv())
+                continue
+            while running and requests.poll():
+                running = handle(requests.recv())
+            if not running:
+                break
+
+            kind, request_id, monitor_index, delay = pending.pop(0)
+            if delay:
+                time.sleep(delay)  # aguardar atualização da tela
+
+            try:
+                if kind == "hash":
+                    from .slides import perceptual_hash
+
+                    width, height, raw = backend.grab(monitor_index)
+                    responses.send(
+                        ("hash", request_id, perceptual_hash(width, height, raw))
+                    )
+                    continue
+
+                monitors = backend.monitors()
+                needed = _frame_size(monitors)
+                if shm is None or needed > slot_size:
+                    if busy:
+                        # Frames ainda em uso pela GUI; espera liberar
+                        pending.insert(0, ("grab", request_id, monitor_index, 0))
+                        running = handle(requests.recv())
+                        continue
+                    if shm is not None:
+                        shm.close()
+                        shm.unlink()
+                    slot_size = needed
+                    shm = shared_memory.SharedMemory(
+                        create=True, size=slot_size * SLOT_COUNT
+                    )
+
+                mon = backend.monitor(monitor_index)
+                width, height, raw = backend.grab(monitor_index)
+
+                slot = next_slot
+                while slot in busy:
+                    slot = (slot + 1) % SLOT_COUNT
+                next_slot = (slot + 1) % SLOT_COUNT
+
+                offset = slot * slot_size
+                shm.buf[offset : offset + len(raw)] = raw
+                busy.add(slot)
+
+                responses.send(
+                    (
+                        "frame",
+                        request_id,
+                        shm.name,
+                        slot,
+                        offset,
+                        width,
+                        height,
+                        (mon.x, mon.y, mon.width, mon.height),
+                    )
+                )
+            except Exception as e:
+                responses.send(("error", request_id, str(e)))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        backend.close()
+        if shm is not None:
+            shm.close()
+            shm.unlink()
@@ -0,0 +1,131 @@
+# devicecache.py
+#
+# Cache em disco da identificação dos nós /dev: com o mesmo apresentador na
+# mesma porta, a partida seguinte só confere cada nó conhecido (número do
+# dispositivo e o link do sysfs) em vez de subir pelos ancestrais de novo.
+# Guarda também o resultado do casamento com os perfis (inclusive "nenhum",
+# para os nós de outros aparelhos) e o nome do sysfs. O cache inteiro vale
+# só para a mesma assinatura do registro: perfil editado invalida tudo.
+
+import os
+import json
+import threading
+
+from . import pointerdevice
+from .pointerdevice import DeviceIdentity, device_identity
+
+CACHE_PATH = os.path.expanduser("~/.cache/pyspotlight/devices.json")
+VERSION = 2  # 2: physical do Bluetooth é o dispositivo HID
+
+
+def _stamp(node):
+    # (st_rdev do nó, destino do link em /sys/class): nó recriado com outro
+    # número ou ligado a outro aparelho não confere
+    name = os.path.basename(node)
+    subsystem = "hidraw" if name.startswith("hidraw") else "input"
+    link = os.readlink(f"{pointerdevice.SYSFS}/class/{subsystem}/{name}")
+    return os.stat(node).st_rdev, link
+
+
+class IdentityCache:
+    def __init__(self, path=CACHE_PATH, log=None):
+        self.path = path
+        self.log = log
+        self.signature = None  # DeviceRegistry.signature dos registros
+        self._entries = {}  # nó → registro
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            if data.get("version") == VERSION:
+                self.signature = data["signature"]
+                self._entries = data["nodes"]
+        except (OSError, ValueError, KeyError, AttributeError):
+            self._entries = {}
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {
+                "version": VERSION,
+                "signature": self.signature,
+                "nodes": self._entries,
+            }
+            self._dirty = False
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            if self.log:
+                self.log(f"* Cache de dispositivos não salvo: {e}")
+
+    def validate(self, signature):
+        # Registros de outra combinação de perfis/plugins não servem
+        with self._lock:
+            if self.signature != signature:
+                self.signature = signature
+                self._entries = {}
+                self._dirty = True
+
+    def lookup(self, node):
+        with self._lock:
+            entry = self._entries.get(node)
+        if entry is None:
+            return None
+        try:
+            rdev, link = _stamp(node)
+        except OSError:
+            rdev = link = None
+        if entry["rdev"] != rdev or entry["link"] != link:
+            with self._lock:
+                self._entries.pop(node, None)
+                self._dirty = True
+            return None
+        return entry
+
+    def sources(self, node):
+        # Origens (ver DeviceRegistry.load) que casaram com o nó, se conferir
+        entry = self.lookup(node)
+        if entry is None:
+            return None
+        return [tuple(source) for source in entry["sources"]]
+
+    def identity(self, node):
+        entry = self.lookup(node)
+        if entry is None or entry.get("vendor") is None:
+            return device_identity(node)
+        return DeviceIdentity(
+            node,
+            entry["vendor"],
+            entry["product"],
+            entry["physical"],
+            entry["parents"],
+            entry["name"],
+        )
+
+    def store(self, node, identity, sources):
+        try:
+            rdev, link = _stamp(node)
+        except OSError:
+            return
+        entry = {"rdev": rdev, "link": link, "sources": [list(s) for s in sources]}
+        if sources:
+            # Só os nós de aparelhos conhecidos guardam a identidade inteira
+            entry.update(
+                vendor=identity.vendor,
+                product=identity.product,
+                physical=identity.physical,
+                parents=identity.parents,
+                name=identity.name,
+            )
+        with self._lock:
+            self._entries[node] = entry
+            self._dirty = True
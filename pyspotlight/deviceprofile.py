@@ -0,0 +1,359 @@
+# deviceprofile.py
+#
+# Perfis declarativos de dispositivo: um arquivo INI por apresentador em
+# pyspotlight/profiles/; o usuário acrescenta perfis ou sobrescreve entradas
+# em ~/.config/pyspotlight/profiles/. Na carga cada perfil vira uma subclasse
+# de BasePointerDevice com o decodificador hidraw (tabela de 256 posições) e
+# os tempos de gesto já compilados: dispositivo novo é um arquivo, não uma
+# classe.
+#
+#   [device]
+#   name = Apresentador X
+#   vendor_id = 0x1234
+#   product_id = 0x5678
+#   modes = mouse spotlight laser
+#   handler = pacote.modulo:Classe     (opcional: comportamento extra)
+#
+#   [filter]      tipo de nó.atributo sysfs = valor exigido (ex:
+#                 hidraw.bInterfaceProtocol), procurado nos ancestrais do nó
+#   [packet]      size, header, trailer, status_offset dos relatórios hidraw
+#   [single]      byte de status = gesto executado direto
+#   [multiple]    byte de status = botão (clique/duplo/longo/repetição)
+#   [aliases]     byte de status = byte equivalente
+#   [keys]        código evdev = botão
+#   [forward]     código evdev = hidden | <modo>... | slide (repasse ao sistema)
+#   [joystick]    x/y = eixo EV_ABS, dead_zone, speed (px/s), exponent, rate
+#                 (Hz) e range (mín máx, se o kernel não informar)
+#   [smoothing]   filtro One-Euro do movimento: min_cutoff (Hz), beta, d_cutoff
+#
+# Drivers de terceiros entram pelo grupo de entry points "pyspotlight.devices",
+# com o vendor:product em hexadecimal no nome e a classe no valor:
+#
+#   [project.entry-points."pyspotlight.devices"]
+#   "1234:5678" = "pacote.modulo:Classe"
+
+import os
+import importlib
+import threading
+import configparser
+from importlib.metadata import entry_points
+
+import evdev.ecodes as ec
+
+from .keymap import MODE_NAMES
+from .pointerdevice import BasePointerDevice, ForwardRule, PacketDecoder
+
+PROFILE_DIR = os.path.join(os.path.dirname(__file__), "profiles")
+USER_PROFILE_DIR = os.path.expanduser("~/.config/pyspotlight/profiles")
+ENTRY_POINT_GROUP = "pyspotlight.devices"
+
+# [device]: opção → (atributo da classe, conversão)
+_DEVICE_OPTIONS = {
+    "name": ("PRODUCT_DESCRIPTION", str),
+    "vendor_id": ("VENDOR_ID", lambda v: int(v, 0)),
+    "product_id": ("PRODUCT_ID", lambda v: int(v, 0)),
+    "keymap": ("KEYMAP_NAME", str),
+    "long_suffix": ("LONG_SUFFIX", str),
+    "release_suffix": ("RELEASE_SUFFIX", str),
+    "double_click_interval": ("DOUBLE_CLICK_INTERVAL", float),
+    "long_press_interval": ("LONG_PRESS_INTERVAL", float),
+    "repeat_interval": ("REPEAT_INTERVAL", float),
+}
+_PACKET_OPTIONS = ("size", "header", "trailer", "status_offset")
+# [joystick]: opção → conversão (ver joystick.JoystickEngine)
+_JOYSTICK_OPTIONS = {
+    "dead_zone": float,
+    "speed": float,
+    "exponent": float,
+    "rate": int,
+}
+_SMOOTHING_OPTIONS = ("min_cutoff", "beta", "d_cutoff")
+
+
+class ProfileError(ValueError):
+    pass
+
+
+def _status_map(config, section):
+    if not config.has_section(section):
+        return {}
+    table = {}
+    for option, value in config.items(section):
+        status = int(option, 0)
+        if not 0 <= status <= 255:
+            raise ProfileError(f"[{section}] byte de status inválido: {option}")
+        table[status] = value
+    return table
+
+
+def _event_code(name):
+    code = ec.ecodes.get(name)
+    if code is None:
+        raise ProfileError(f"código evdev desconhecido: {name}")
+    return code
+
+
+def _modes(value):
+    try:
+        return tuple(MODE_NAMES[m] for m in value.split())
+    except KeyError as e:
+        raise ProfileError(f"modo desconhecido: {e.args[0]}") from None
+
+
+def _forward_rule(value):
+    hidden = slide = False
+    modes = []
+    for token in value.split():
+        if token == "hidden":
+            hidden = True
+        elif token == "slide":
+            slide = True
+        else:
+            modes.extend(_modes(token))
+    return ForwardRule(hidden, frozenset(modes), slide)
+
+
+def _handler(spec):
+    module, _, attr = spec.partition(":")
+    try:
+        cls = getattr(importlib.import_module(module), attr)
+    except (ImportError, AttributeError) as e:
+        raise ProfileError(f"handler inválido {spec}: {e}") from None
+    if not issubclass(cls, BasePointerDevice):
+        raise ProfileError(f"handler não é um dispositivo: {spec}")
+    return cls
+
+
+def compile_profile(name, config):
+    # Traduz o perfil para os atributos de classe que BasePointerDevice usa
+    if not config.has_section("device"):
+        raise ProfileError("seção [device] ausente")
+    device = config["device"]
+    attrs = {"PROFILE_NAME": name, "KEYMAP_NAME": name}
+    for option, (attr, convert) in _DEVICE_OPTIONS.items():
+        if option in device:
+            attrs[attr] = convert(device[option])
+    if attrs.get("VENDOR_ID") is None or attrs.get("PRODUCT_ID") is None:
+        raise ProfileError("vendor_id e product_id são obrigatórios")
+    if "modes" in device:
+        attrs["COMPATIBLE_MODES"] = _modes(device["modes"])
+    attrs["SUPPORT_AUTO_MODE"] = device.getboolean("auto_mode", False)
+
+    filters = {}
+    if config.has_section("filter"):
+        for option, value in config.items("filter"):
+            kind, sep, attr = option.partition(".")
+            if not sep:
+                raise ProfileError(f"[filter] esperado tipo.atributo: {option}")
+            filters.setdefault(kind, {})[attr] = value.lower()
+    attrs["INTERFACE_FILTERS"] = filters
+
+    if config.has_section("packet"):
+        packet = config["packet"]
+        missing = [o for o in _PACKET_OPTIONS if o not in packet]
+        if missing:
+            raise ProfileError(f"[packet] faltando: {', '.join(missing)}")
+        single = _status_map(config, "single")
+        multiple = _status_map(config, "multiple")
+        aliases = {
+            status: int(target, 0)
+            for status, target in _status_map(config, "aliases").items()
+        }
+        attrs["SINGLE_BUTTONS"] = single
+        attrs["MULTIPLE_BUTTONS"] = multiple
+        attrs["_decoder"] = PacketDecoder(
+            *(int(packet[o], 0) for o in _PACKET_OPTIONS),
+            single,
+            multiple,
+            aliases,
+        )
+
+    if config.has_section("keys"):
+        attrs["KEY_BUTTON_MAP"] = {
+            _event_code(code): button for code, button in config.items("keys")
+        }
+    if config.has_section("forward"):
+        attrs["FORWARD_KEYS"] = {
+            _event_code(code): _forward_rule(value)
+            for code, value in config.items("forward")
+        }
+
+    if config.has_section("joystick"):
+        joystick = config["joystick"]
+        axes = {}
+        for index, option in enumerate(("x", "y")):
+            if option in joystick:
+                axes[_event_code(joystick[option])] = index
+        if not axes:
+            raise ProfileError("[joystick] sem eixos x/y")
+        settings = {
+            option: convert(joystick[option])
+            for option, convert in _JOYSTICK_OPTIONS.items()
+            if option in joystick
+        }
+        if "range" in joystick:
+            settings["minimum"], settings["maximum"] = map(
+                int, joystick["range"].split()
+            )
+        attrs["JOYSTICK_AXES"] = axes
+        attrs["JOYSTICK"] = settings
+
+    if config.has_section("smoothing"):
+        smoothing = config["smoothing"]
+        attrs["SMOOTHING"] = {
+            option: float(smoothing[option])
+            for option in _SMOOTHING_OPTIONS
+            if option in smoothing
+        }
+
+    base = _handler(device["handler"]) if "handler" in device else BasePointerDevice
+    class_name = device.get("class", base.__name__ if "handler" in device else name)
+    return type(class_name, (base,), attrs)
+
+
+def _profile_names():
+    names = set()
+    for directory in (PROFILE_DIR, USER_PROFILE_DIR):
+        if os.path.isdir(directory):
+            names.update(
+                f[: -len(".ini")] for f in os.listdir(directory) if f.endswith(".ini")
+            )
+    return sorted(names)
+
+
+def _plugin(spec, vendor, product):
+    # Classe de um entry point; como os handlers dos perfis, pode deixar os
+    # ids de fora: vêm do nome do entry point
+    cls = _handler(spec)
+    if cls.VENDOR_ID is None and cls.PRODUCT_ID is None:
+        return type(cls.__name__, (cls,), {"VENDOR_ID": vendor, "PRODUCT_ID": product})
+    if (cls.VENDOR_ID, cls.PRODUCT_ID) != (vendor, product):
+        ids = ":".join(
+            "?" if v is None else f"{v:04x}" for v in (cls.VENDOR_ID, cls.PRODUCT_ID)
+        )
+        raise ProfileError(
+            f"ids {ids} da classe diferem do entry point {vendor:04x}:{product:04x}"
+        )
+    return cls
+
+
+def _read_profile(name):
+    config = configparser.ConfigParser(interpolation=None)
+    config.optionxform = str
+    config.read(
+        [
+            os.path.join(PROFILE_DIR, f"{name}.ini"),
+            os.path.join(USER_PROFILE_DIR, f"{name}.ini"),
+        ]
+    )
+    return config
+
+
+def load_profile(name):
+    try:
+        return compile_profile(name, _read_profile(name))
+    except (ValueError, configparser.Error) as e:
+        raise ProfileError(str(e)) from None
+
+
+def _profile_stamp(name):
+    # Mudou um arquivo do perfil, muda o carimbo (ver DeviceRegistry.signature)
+    stamp = 0.0
+    for directory in (PROFILE_DIR, USER_PROFILE_DIR):
+        try:
+            path = os.path.join(directory, f"{name}.ini")
+            stamp = max(stamp, os.stat(path).st_mtime)
+        except OSError:
+            pass
+    return stamp
+
+
+def _profile_ids(name):
+    # Só o vendor/product do [device]: sem compilar nem importar o handler
+    try:
+        device = _read_profile(name)["device"]
+        return int(device["vendor_id"], 0), int(device["product_id"], 0)
+    except (KeyError, ValueError, configparser.Error) as e:
+        raise ProfileError(f"vendor_id/product_id: {e}") from None
+
+
+class DeviceRegistry:
+    # (vendor, product) → perfis e plugins daquele aparelho. Na partida só se
+    # lê o [device] de cada perfil e o nome dos entry points; a classe é
+    # compilada (e o handler importado) quando um nó com esse id aparece
+    def __init__(self, log=None):
+        self.log = log
+        # (vendor, product) → [("profile", nome) | ("plugin", spec, vendor, product)]
+        self._index = {}
+        self._classes = {}  # origem → classe, ou None se falhou
+        self._lock = threading.Lock()
+        # Perfis e plugins com carimbo: o cache de identidades só vale para a
+        # mesma assinatura (ver devicecache.py)
+        self.signature = []
+        for name in _profile_names():
+            self.signature.append(["profile", name, _profile_stamp(name)])
+            try:
+                self._add(_profile_ids(name), ("profile", name))
+            except ProfileError as e:
+                self._error(f"Perfil {name}: {e}")
+        for ep in entry_points(group=ENTRY_POINT_GROUP):
+            version = ep.dist.version if ep.dist else ""
+            self.signature.append(["plugin", f"{ep.name}={ep.value}", version])
+            try:
+                vendor, product = (int(v, 16) for v in ep.name.split(":"))
+            except ValueError:
+                self._error(f"Plugin {ep.value}: nome deve ser vendor:product")
+                continue
+            self._add((vendor, product), ("plugin", ep.value, vendor, product))
+
+    def _add(self, ids, source):
+        self._index.setdefault(ids, []).append(source)
+
+    def _error(self, message):
+        if self.log:
+            self.log(f"[ERRO] {message}")
+
+    def __len__(self):
+        return sum(len(sources) for sources in self._index.values())
+
+    def classes_for(self, vendor, product):
+        return [cls for _, cls in self.candidates(vendor, product)]
+
+    def candidates(self, vendor, product):
+        # (origem, classe) de cada perfil/plugin do vendor/product
+        pairs = []
+        for source in self._index.get((vendor, product), ()):
+            cls = self.load(source)
+            if cls is not None:
+                pairs.append((source, cls))
+        return pairs
+
+    def load(self, source):
+        # Com trava: a mesma origem tem de virar sempre a mesma classe, que é
+        # parte da chave dos dispositivos monitorados
+        with self._lock:
+            if source in self._classes:
+                return self._classes[source]
+            kind, ref = source[:2]
+            try:
+                if kind == "profile":
+                    cls = load_profile(ref)
+                else:
+                    cls = _plugin(ref, *source[2:])
+            except ProfileError as e:
+                self._error(f"{'Perfil' if kind == 'profile' else 'Plugin'} {ref}: {e}")
+                cls = None
+            self._classes[source] = cls
+            return cls
+
+
+def load_profiles(log=None):
+    # nome do perfil → classe do dispositivo; perfis inválidos ficam de fora
+    classes = {}
+    for name in _profile_names():
+        try:
+            classes[name] = load_profile(name)
+        except ProfileError as e:
+            if log:
+                log(f"[ERRO] Perfil {name}: {e}")
+    return classes
@@ -1,24 +1,43 @@
 import os
 import time
-import pyudev
 import glob
-import threading
 
-from pyspotlight.genericvrbox import GenericVRBoxPointer
-from pyspotlight.baseusorangedotai import BaseusOrangeDotAI
+from pyspotlight.deviceprofile import DeviceRegistry
+from pyspotlight.pointerdevice import device_identity, physical_device
 
+# Um apresentador gera vários nós (hidraw e event por interface) numa rajada
+# de eventos do udev: agrupa por aparelho físico e só anexa depois de
+# HOTPLUG_DEBOUNCE sem nós novos; nó sem permissão ainda é verificado de novo
+# a cada HOTPLUG_RETRY até HOTPLUG_TIMEOUT
+HOTPLUG_DEBOUNCE = 0.05
+HOTPLUG_RETRY = 0.02
+HOTPLUG_TIMEOUT = 3.0
 
-DEVICE_CLASSES = {
-    BaseusOrangeDotAI,
-    GenericVRBoxPointer,
-}
+
+class PendingPlug:
+    __slots__ = ("since", "paths", "attached", "timer")
+
+    def __init__(self, since):
+        self.since = since  # primeiro evento do aparelho, para o tempo até pronto
+        self.paths = set()
+        self.attached = 0
+        self.timer = None
 
 
 class DeviceMonitor:
     def __init__(self, context):
         self._ctx = context
+        # (classe, aparelho físico) → instância: dois apresentadores do mesmo
+        # modelo são dispositivos distintos, cada um com seu ponteiro
         self._monitored_devices = {}
         self._hotplug_callbacks = []
+        self._udev_monitor = None
+        self._pending_plugs = {}  # aparelho físico → PendingPlug
+        # Perfis em pyspotlight/profiles/ (e do usuário) e plugins, indexados
+        # por vendor/product; cada um só é carregado quando o aparelho aparece
+        self._registry = DeviceRegistry(context.log)
+        self._cache = context.device_cache
+        self._cache.validate(self._registry.signature)
 
     def start_monitoring(self):
         self.monitor_usb_hotplug()
@@ -29,16 +48,25 @@ class DeviceMonitor:
                 self.add_monitored_device(cls, path)
         else:
             self._ctx.log("* Nenhum dispositivo compatível encontrado.")
+        self._cache.save()
 
     def add_monitored_device(self, cls, path=None):
-        if cls not in self._monitored_devices:
+        identity = self._cache.identity(path)
+        key = (cls, (identity.physical if identity else None) or path)
+        if key not in self._monitored_devices:
             dev = cls(app_ctx=self._ctx, hidraw_path=path)
-            threading.Thread(target=dev.monitor, daemon=True).start()
-            self._monitored_devices[cls] = dev
+            record_dir = os.environ.get("PYSPOTLIGHT_RECORD")
+            if record_dir:
+                stamp = time.strftime("%Y%m%d-%H%M%S")
+                dev.start_recording(
+                    os.path.join(record_dir, f"{cls.__name__}-{stamp}.rec")
+                )
+            dev.ensure_monitoring()
+            self._monitored_devices[key] = dev
             self._notify_callbacks()
             self._ctx.log(f"Adicionando dispositivo: {cls.__name__} com path {path}")
         else:
-            dev = self._monitored_devices[cls]
+            dev = self._monitored_devices[key]
             dev.add_known_path(path)
             # dev.ensure_monitoring()
             self._ctx.log(
@@ -46,20 +74,18 @@ class DeviceMonitor:
             )
 
     def remove_monitored_device(self, dev):
-        # Encontra a classe correspondente à instância
-        for cls, inst in list(self._monitored_devices.items()):
+        # Encontra a chave correspondente à instância
+        for key, inst in list(self._monitored_devices.items()):
             if inst is dev:
                 inst.stop()
-                del self._monitored_devices[cls]
+                del self._monitored_devices[key]
                 break
         self._notify_callbacks()
 
     def remove_monitored_device_path(self, path):
         for dev in self.get_monitored_devices():
             if path in dev._known_paths:
-                self._ctx.log(f"- Removendo path {path} do dispositivo {dev}")
-                dev._known_paths.remove(path)
-                if not dev._known_paths:
+                if dev.remove_known_path(path):
                     self._ctx.log(
                         f"* Nenhum dispositivo restante para monitorar. Encerrando thread."
                     )
@@ -79,18 +105,36 @@ class DeviceMonitor:
         for cb in self._hotplug_callbacks:
             cb()
 
+    def classes_for(self, path):
+        # Nó já visto (cache conferido): só carrega as classes que casaram
+        sources = self._cache.sources(path)
+        if sources is not None:
+            classes = (self._registry.load(source) for source in sources)
+            return [cls for cls in classes if cls is not None]
+        # Uma leitura do sysfs por nó; só as classes do vendor/product dele
+        identity = device_identity(path)
+        if identity is None:
+            return []
+        matched = [
+            (source, cls)
+            for source, cls in self._registry.candidates(
+                identity.vendor, identity.product
+            )
+            if cls.matches(identity)
+        ]
+        self._cache.store(path, identity, [source for source, _ in matched])
+        return [cls for _, cls in matched]
+
     def find_known_devices(self):
         devices = []
         for path in glob.glob("/dev/hidraw*"):
-            for cls in DEVICE_CLASSES:
-                if cls.is_known_device(path):
-                    devices.append((path, cls))
+            for cls in self.classes_for(path):
+                devices.append((path, cls))
         for path in glob.glob("/dev/input/*"):
             if not os.path.isfile(path):
                 continue
-            for cls in DEVICE_CLASSES:
-                if cls.is_known_device(path):
-                    devices.append((path, cls))
+            for cls in self.classes_for(path):
+                devices.append((path, cls))
 
         return devices
 
@@ -100,18 +144,11 @@ class DeviceMonitor:
             return
 
         if action == "add":
-            if path.startswith("/dev/hidraw") or path.startswith("/dev/input"):
-                time.sleep(0.8)
-                for dev in self.get_monitored_devices():
-                    if dev.known_path(path):
-                        return  # já monitorado
-                for cls in DEVICE_CLASSES:
-                    if cls.is_known_device(path):
-                        self._ctx.log(
-                            f"+ Novo dispositivo compatível conectado: {path}"
-                        )
-                        self.add_monitored_device(cls, path)
+            if path.startswith("/dev/hidraw") or path.startswith("/dev/input/event"):
+                self._queue_plug(path)
         elif action == "remove":
+            for plug in self._pending_plugs.values():
+                plug.paths.discard(path)
             for dev in self.get_monitored_devices():
                 self._ctx.log(
                     f"Verificando dispositivo {dev.__class__.__name__} com paths {dev._known_paths}"
@@ -119,16 +156,77 @@ class DeviceMonitor:
                 if dev.known_path(path):
                     self.remove_monitored_device_path(path)
 
+    def _queue_plug(self, path):
+        key = physical_device(path) or path
+        plug = self._pending_plugs.get(key)
+        if plug is None:
+            plug = self._pending_plugs[key] = PendingPlug(time.monotonic())
+        plug.paths.add(path)
+        if plug.timer is not None:
+            plug.timer.cancel()
+        plug.timer = self._ctx.scheduler.schedule(
+            HOTPLUG_DEBOUNCE, self._reactor_settle, key
+        )
+
+    def _reactor_settle(self, key):
+        self._ctx.reactor.call_soon(self._settle_plug, key)
+
+    def _settle_plug(self, key):
+        plug = self._pending_plugs.get(key)
+        if plug is None:
+            return
+        plug.timer = None
+        waiting = set()
+        # hidraw primeiro: é o caminho principal do dispositivo criado
+        for path in sorted(plug.paths, key=lambda p: "hidraw" not in p):
+            if not os.path.exists(path):
+                continue  # removido antes de ficar pronto
+            if not os.access(path, os.R_OK):
+                waiting.add(path)  # regras do udev ainda aplicando permissões
+                continue
+            if self.hotplug_added(path):
+                plug.attached += 1
+        elapsed = time.monotonic() - plug.since
+        if waiting and elapsed < HOTPLUG_TIMEOUT:
+            plug.paths = waiting
+            plug.timer = self._ctx.scheduler.schedule(
+                HOTPLUG_RETRY, self._reactor_settle, key
+            )
+            return
+        del self._pending_plugs[key]
+        self._cache.save()
+        for path in sorted(waiting):
+            self._ctx.log(f"* Sem permissão para acessar {path}")
+        if plug.attached:
+            self._ctx.log(
+                f"+ Dispositivo pronto em {elapsed * 1e3:.0f} ms "
+                f"({plug.attached} nós)"
+            )
+
+    def hotplug_added(self, path):
+        for dev in self.get_monitored_devices():
+            if dev.known_path(path):
+                return False  # já monitorado
+        classes = self.classes_for(path)
+        for cls in classes:
+            self._ctx.log(f"+ Novo dispositivo compatível conectado: {path}")
+            self.add_monitored_device(cls, path)
+        return bool(classes)
+
     def monitor_usb_hotplug(self):
-        def monitor_loop():
-            context = pyudev.Context()
-            monitor = pyudev.Monitor.from_netlink(context)
-            monitor.filter_by("input")
-            monitor.filter_by("hidraw")
-            monitor.start()
-
-            for device in iter(monitor.poll, None):
+        import pyudev
+
+        context = pyudev.Context()
+        monitor = pyudev.Monitor.from_netlink(context)
+        monitor.filter_by("input")
+        monitor.filter_by("hidraw")
+        monitor.start()
+
+        def read_hotplug():
+            # Socket netlink no mesmo epoll dos dispositivos
+            for device in iter(lambda: monitor.poll(timeout=0), None):
                 action = device.action  # 'add' ou 'remove'
                 self.hotplug_callback(action, device)
 
-        threading.Thread(target=monitor_loop, daemon=True).start()
+        self._udev_monitor = monitor
+        self._ctx.reactor.register(monitor.fileno(), read_hotplug)
@@ -0,0 +1,110 @@
+# joystick.py
+#
+# Eixos absolutos (EV_ABS) de um analógico → movimento relativo do ponteiro.
+# Zona morta e curva de aceleração vêm pré-calculadas numa tabela por eixo
+# (valor bruto → pixels por passo); um integrador de passo fixo no scheduler
+# soma a velocidade com acúmulo de subpixel e entrega (dx, dy) por passo, um
+# frame só. Sem deflexão o timer para: nada acorda com o analógico parado.
+
+import threading
+
+LUT_SIZE = 1024  # faixas maiores são quantizadas
+
+
+class Axis:
+    __slots__ = ("minimum", "span", "table", "step")
+
+    def __init__(self, table, minimum, maximum):
+        self.minimum = minimum
+        self.span = max(1, maximum - minimum)
+        self.table = table
+        # Com faixa maior que a tabela, vários valores caem no mesmo índice
+        self.step = len(self.table) - 1
+
+    def velocity(self, value):
+        index = (value - self.minimum) * self.step // self.span
+        return self.table[min(max(index, 0), self.step)]
+
+
+class JoystickEngine:
+    def __init__(
+        self,
+        scheduler,
+        emit,
+        dead_zone=0.1,
+        speed=1200.0,
+        exponent=2.0,
+        rate=250,
+        minimum=0,
+        maximum=255,
+    ):
+        self.scheduler = scheduler
+        self.emit = emit  # emit(dx, dy) em pixels inteiros
+        self.dead_zone = dead_zone
+        self.speed = speed  # px/s na deflexão máxima
+        self.exponent = exponent
+        self.period = 1.0 / rate
+
+        axis = self._axis(minimum, maximum)
+        self._axes = [axis, axis]
+        self._velocity = [0.0, 0.0]  # px por passo
+        self._remainder = [0.0, 0.0]  # subpixel acumulado
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def _axis(self, minimum, maximum):
+        # Índice → px por passo, de -1 a 1 de deflexão, com a zona morta
+        size = min(maximum - minimum + 1, LUT_SIZE)
+        dead = self.dead_zone
+        per_step = self.speed * self.period
+        table = []
+        for i in range(size):
+            n = i / (size - 1) * 2 - 1
+            mag = abs(n)
+            if mag <= dead:
+                table.append(0.0)
+                continue
+            mag = min(1.0, (mag - dead) / (1 - dead)) ** self.exponent
+            table.append(mag * per_step if n > 0 else -mag * per_step)
+        return Axis(tuple(table), minimum, maximum)
+
+    def set_range(self, axis, minimum, maximum):
+        if maximum > minimum:
+            self._axes[axis] = self._axis(minimum, maximum)
+
+    def update(self, axis, value, timestamp=None):
+        velocity = self._axes[axis].velocity(value)
+        with self._lock:
+            self._velocity[axis] = velocity
+            if velocity == 0.0:
+                self._remainder[axis] = 0.0
+            if self._timer is None and (self._velocity[0] or self._velocity[1]):
+                now = self.scheduler.clock() if timestamp is None else timestamp
+                self._timer = self.scheduler.schedule_at(
+                    now + self.period, self._tick, now + self.period
+                )
+
+    def stop(self):
+        with self._lock:
+            timer, self._timer = self._timer, None
+            self._velocity = [0.0, 0.0]
+            self._remainder = [0.0, 0.0]
+        if timer:
+            timer.cancel()
+
+    def _tick(self, when):
+        with self._lock:
+            vx, vy = self._velocity
+            if not (vx or vy):
+                self._timer = None
+                return
+            rem = self._remainder
+            x = rem[0] + vx
+            y = rem[1] + vy
+            dx, dy = int(x), int(y)
+            rem[0], rem[1] = x - dx, y - dy
+            # Passo fixo sem acumular atraso (como a repetição de gestos)
+            next_when = max(when + self.period, self.scheduler.clock())
+            self._timer = self.scheduler.schedule_at(next_when, self._tick, next_when)
+        if dx or dy:
+            self.emit(dx, dy)
@@ -0,0 +1,186 @@
+# keymap.py
+#
+# Mapa de botões por dispositivo: arquivos INI compilados numa tabela
+# (gesto, modo, overlay visível) → ação. O padrão vem de pyspotlight/keymaps/
+# e o usuário sobrescreve entradas em ~/.config/pyspotlight/keymaps/.
+#
+#   [VOL_UP+repeat]
+#   pen = change_line_width 1
+#   laser.visible = change_laser_size 1
+#   * = switch_mode step=-1
+#   *.hidden = key KEY_B
+#   mouse =
+#
+# Seção: gesto (botão, botão++, botão+long, botão+repeat, ...). Opção: modo,
+# ou * para todos, com .visible/.hidden opcional; a mais específica vence e
+# valor vazio desliga a entrada herdada. Ações: método do overlay (padrão,
+# executado no próximo frame da GUI), "device.<método>", "key KEY_X" e
+# "chord KEY_A KEY_B", separadas por ";".
+
+import os
+import configparser
+
+import uinput
+
+from .utils import (
+    MODE_LASER,
+    MODE_MAG_GLASS,
+    MODE_MOUSE,
+    MODE_PEN,
+    MODE_SPOTLIGHT,
+)
+
+KEYMAP_DIR = os.path.join(os.path.dirname(__file__), "keymaps")
+USER_KEYMAP_DIR = os.path.expanduser("~/.config/pyspotlight/keymaps")
+
+MODE_NAMES = {
+    "mouse": MODE_MOUSE,
+    "spotlight": MODE_SPOTLIGHT,
+    "laser": MODE_LASER,
+    "pen": MODE_PEN,
+    "mag_glass": MODE_MAG_GLASS,
+}
+VISIBILITY = {"visible": (True,), "hidden": (False,), None: (True, False)}
+
+
+class KeymapError(ValueError):
+    pass
+
+
+def _literal(token):
+    for convert in (int, float):
+        try:
+            return convert(token)
+        except ValueError:
+            pass
+    if token in ("True", "False"):
+        return token == "True"
+    return token
+
+
+def _key_code(name):
+    code = getattr(uinput, name, None)
+    if code is None:
+        raise KeymapError(f"tecla desconhecida: {name}")
+    return code
+
+
+def parse_action(text):
+    steps = []
+    for part in text.split(";"):
+        tokens = part.split()
+        if not tokens:
+            continue
+        head, params = tokens[0], tokens[1:]
+        if head == "key":
+            if len(params) != 1:
+                raise KeymapError(f"'key' espera uma tecla: {part.strip()}")
+            steps.append(("key", _key_code(params[0])))
+        elif head == "chord":
+            if len(params) < 2:
+                raise KeymapError(f"'chord' espera duas teclas: {part.strip()}")
+            steps.append(("chord", [_key_code(p) for p in params]))
+        else:
+            target, _, name = head.rpartition(".")
+            if target not in ("", "device"):
+                raise KeymapError(f"alvo desconhecido: {head}")
+            args = []
+            kwargs = {}
+            for p in params:
+                key, sep, value = p.partition("=")
+                if sep:
+                    kwargs[key] = _literal(value)
+                else:
+                    args.append(_literal(p))
+            steps.append((target or "overlay", name, tuple(args), kwargs))
+    return tuple(steps)
+
+
+def _parse_scope(option):
+    mode, _, visibility = option.partition(".")
+    if mode != "*" and mode not in MODE_NAMES:
+        raise KeymapError(f"modo desconhecido: {mode}")
+    if (visibility or None) not in VISIBILITY:
+        raise KeymapError(f"visibilidade desconhecida: {visibility}")
+    modes = MODE_NAMES.values() if mode == "*" else (MODE_NAMES[mode],)
+    # Mais específico vence: *, *.vis, modo, modo.vis
+    rank = (mode != "*") * 2 + bool(visibility)
+    return rank, modes, VISIBILITY[visibility or None]
+
+
+def load_keymap(name, log=None):
+    config = configparser.ConfigParser(interpolation=None)
+    config.optionxform = str
+    paths = [
+        os.path.join(KEYMAP_DIR, f"{name}.ini"),
+        os.path.join(USER_KEYMAP_DIR, f"{name}.ini"),
+    ]
+    config.read(paths)
+
+    table = {}
+    for gesture in config.sections():
+        scoped = []
+        for option, value in config.items(gesture):
+            try:
+                rank, modes, visible = _parse_scope(option)
+                steps = parse_action(value)
+            except KeymapError as e:
+                if log:
+                    log(f"[ERRO] Keymap {name} [{gesture}] {option}: {e}")
+                continue
+            scoped.append((rank, modes, visible, steps))
+
+        for _, modes, visible, steps in sorted(scoped, key=lambda s: s[0]):
+            for mode in modes:
+                for v in visible:
+                    if steps:
+                        table[(gesture, mode, v)] = steps
+                    else:
+                        table.pop((gesture, mode, v), None)
+    return table
+
+
+def _bind_step(step, device):
+    kind = step[0]
+    if kind == "key":
+        code = step[1]
+        return lambda: device.emit_key_press(code)
+    if kind == "chord":
+        codes = step[1]
+        return lambda: device.emit_key_chord(codes)
+
+    _, name, args, kwargs = step
+    if kind == "device":
+        method = getattr(device, name)
+        return lambda: method(*args, **kwargs)
+    # Overlay: enfileira para a thread da GUI, no ponteiro do dispositivo
+    # (ver SpotlightOverlayWindow.post_to)
+    ctx = device._ctx
+    pointer = device.pointer_id
+    return lambda: ctx.overlay_window.post_to(pointer, name, *args, **kwargs)
+
+
+def bind_keymap(table, device, log=None):
+    # Liga cada entrada a um callable; passos iguais compartilham o callable
+    bound = {}
+    cache = {}
+    for key, steps in table.items():
+        action = cache.get(id(steps))
+        if action is None:
+            try:
+                calls = [_bind_step(step, device) for step in steps]
+            except AttributeError as e:
+                if log:
+                    log(f"[ERRO] Keymap {key[0]}: {e}")
+                continue
+            if len(calls) == 1:
+                action = calls[0]
+            else:
+
+                def action(calls=tuple(calls)):
+                    for call in calls:
+                        call()
+
+            cache[id(steps)] = action
+        bound[key] = action
+    return bound
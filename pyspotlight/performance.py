@@ -0,0 +1,152 @@
+# performance.py
+#
+# Prioridade e afinidade de CPU das threads de entrada (reator de E/S e
+# timers de gestos), para que carga no sistema (compartilhamento de tela,
+# vídeo) não atrase a leitura nem a classificação de cliques. Configurado em
+# [Performance] no config.ini:
+#
+#   [Performance]
+#   realtime = fifo     ; fifo, rr ou off
+#   priority = 10       ; 1-99, para fifo/rr
+#   nice = -5           ; usado quando o tempo real é negado
+#   cpus = 2            ; núcleos das threads de entrada, ex: 2,3
+#   jitter_log = 60     ; intervalo (s) do log de atraso; 0 desliga
+#
+# Sem CAP_SYS_NICE/RLIMIT_RTPRIO cai para o nice e, sem nem isso, segue na
+# prioridade normal; o resultado vai para o log.
+
+import os
+import time
+import threading
+import configparser
+
+CONFIG_PATH = os.path.expanduser("~/.config/pyspotlight/config.ini")
+
+POLICIES = {
+    "fifo": os.SCHED_FIFO,
+    "rr": os.SCHED_RR,
+    "off": None,
+}
+
+
+class PerformanceSettings:
+    def __init__(self, realtime="off", priority=10, nice=0, cpus=(), jitter_log=0):
+        self.realtime = realtime
+        self.priority = priority
+        self.nice = nice
+        self.cpus = tuple(cpus)
+        self.jitter_log = jitter_log
+
+    @property
+    def enabled(self):
+        return self.realtime != "off" or bool(self.nice or self.cpus)
+
+    @classmethod
+    def load(cls, path=CONFIG_PATH, log=None):
+        config = configparser.ConfigParser()
+        config.read(path)
+        if "Performance" not in config:
+            return cls()
+        section = config["Performance"]
+        try:
+            realtime = section.get("realtime", "off").lower()
+            if realtime not in POLICIES:
+                raise ValueError(f"realtime desconhecido: {realtime}")
+            cpus = [int(c) for c in section.get("cpus", "").replace(",", " ").split()]
+            return cls(
+                realtime=realtime,
+                priority=section.getint("priority", 10),
+                nice=section.getint("nice", 0),
+                cpus=cpus,
+                jitter_log=section.getfloat("jitter_log", 0),
+            )
+        except ValueError as e:
+            if log:
+                log(f"[ERRO] Config [Performance]: {e}")
+            return cls()
+
+    def apply(self, log=None):
+        # Aplica à thread que chama: no Linux prioridade, nice e afinidade são
+        # por thread (tid)
+        if not self.enabled:
+            return
+        tid = threading.get_native_id()
+        name = threading.current_thread().name
+        applied = []
+
+        if self.cpus:
+            try:
+                os.sched_setaffinity(tid, self.cpus)
+                applied.append(f"cpus {','.join(map(str, self.cpus))}")
+            except OSError as e:
+                applied.append(f"sem afinidade ({e.strerror})")
+
+        realtime = False
+        policy = POLICIES[self.realtime]
+        if policy is not None:
+            try:
+                os.sched_setscheduler(tid, policy, os.sched_param(self.priority))
+                applied.append(f"{self.realtime} {self.priority}")
+                realtime = True
+            except OSError as e:
+                applied.append(f"sem tempo real ({e.strerror})")
+
+        if not realtime and self.nice:
+            try:
+                os.setpriority(os.PRIO_PROCESS, tid, self.nice)
+                applied.append(f"nice {self.nice}")
+            except OSError as e:
+                applied.append(f"sem nice ({e.strerror})")
+
+        if log:
+            log(f"* {name}: {', '.join(applied)}")
+
+    def jitter_stats(self, label, log):
+        if self.jitter_log > 0 and log:
+            return JitterStats(label, self.jitter_log, log)
+        return None
+
+
+class JitterStats:
+    # Atraso entre o instante previsto (prazo do timer, timestamp do evento)
+    # e a execução, resumido no log a cada "interval" segundos
+    __slots__ = (
+        "label",
+        "interval",
+        "log",
+        "clock",
+        "since",
+        "count",
+        "total",
+        "max",
+    )
+
+    def __init__(self, label, interval, log, clock=time.monotonic):
+        self.label = label
+        self.interval = interval
+        self.log = log
+        self.clock = clock
+        self.since = clock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, delay):
+        self.count += 1
+        self.total += delay
+        if delay > self.max:
+            self.max = delay
+        now = self.clock()
+        if now - self.since >= self.interval:
+            self.flush(now)
+
+    def flush(self, now=None):
+        if self.count:
+            self.log(
+                f"* Atraso {self.label}: n={self.count} "
+                f"média={self.total / self.count * 1e6:.0f} µs "
+                f"máx={self.max * 1e6:.0f} µs"
+            )
+        self.since = self.clock() if now is None else now
+        self.count = 0
+        self.total = self.max = 0.0
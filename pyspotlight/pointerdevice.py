@@ -1,60 +1,692 @@
 import os
+import time
+import errno
+import fcntl
+import struct
 import threading
-import subprocess
-import select
+import re
 import glob
 import evdev
+import evdev.ecodes as ec
+from collections import namedtuple
 
+from .joystick import JoystickEngine
+from .keymap import bind_keymap, load_keymap
+from .smoothing import SETTLE_DELAY, SETTLE_INTERVAL, MotionSmoother
 
-class SingletonMeta(type):
-    _instances = {}
 
-    def __call__(cls, *args, **kwargs):
-        instance = cls._instances.get(cls)
-        if instance is None:
-            instance = super().__call__(*args, **kwargs)
-            cls._instances[cls] = instance
-        return instance
+BUTTON_SINGLE = 1  # executa direto, sem tratamento de clique/duplo/longo
+BUTTON_MULTIPLE = 2  # passa pelo tratamento de pressionar/soltar
+PACKET_RELEASE = ("", 0)  # status 0: solta o botão ativo
+# _IOW('E', 0xa0, int): timestamps do evdev no CLOCK_MONOTONIC
+EVIOCSCLOCKID = 0x400445A0
 
+# Repasse de uma tecla do evdev ao sistema: com o overlay oculto (hidden),
+# nos modos listados mesmo visível, e se avisa o overlay da troca de slide
+ForwardRule = namedtuple("ForwardRule", "hidden modes slide")
 
-class BasePointerDevice(metaclass=SingletonMeta):
+# Nome do dispositivo HID no sysfs: barramento:vendor:product.instância
+_HID_DIR = re.compile(r"^[0-9A-F]{4}:[0-9A-F]{4}:[0-9A-F]{4}\.[0-9A-F]+$")
+
+SYSFS = "/sys"
+
+# Frames do uinput são escritos por mais de uma thread (reator e scheduler)
+_UI_LOCK = threading.Lock()
+
+
+class DeviceIdentity:
+    # Identificação de um nó /dev lida do sysfs no próprio processo (antes era
+    # um "udevadm info -a" por nó e por classe, com busca de substring). Uma
+    # subida pelos ancestrais resolve vendor/product, o aparelho físico e a
+    # cadeia onde os filtros procuram atributos
+    __slots__ = (
+        "node",
+        "vendor",
+        "product",
+        "physical",
+        "parents",
+        "_name",
+        "_attrs",
+    )
+
+    def __init__(self, node, vendor, product, physical, parents, name=None):
+        self.node = node
+        self.vendor = vendor
+        self.product = product
+        self.physical = physical
+        self.parents = parents
+        self._name = name
+        self._attrs = {}
+
+    @property
+    def name(self):
+        # "name" do inputN ou HID_NAME do dispositivo HID, lido uma vez
+        if self._name is None:
+            self._name = _sysfs_name(self.parents[0]) if self.parents else ""
+        return self._name
+
+    def attr(self, name):
+        # Como ATTRS{} do udev: o valor no ancestral mais próximo que o tem
+        value = self._attrs.get(name)
+        if value is None:
+            value = ""
+            for parent in self.parents:
+                try:
+                    with open(os.path.join(parent, name)) as f:
+                        value = f.read().strip().lower()
+                    break
+                except OSError:
+                    continue
+            self._attrs[name] = value
+        return value
+
+
+def _sysfs_name(path):
+    try:
+        with open(os.path.join(path, "name")) as f:
+            return f.read().strip()
+    except OSError:
+        pass
+    try:
+        with open(os.path.join(path, "uevent")) as f:
+            for line in f:
+                if line.startswith("HID_NAME="):
+                    return line.strip().split("=", 1)[1]
+    except OSError:
+        pass
+    return ""
+
+
+def _read_hex(path):
+    try:
+        with open(path) as f:
+            return int(f.read().strip(), 16)
+    except (OSError, ValueError):
+        return None
+
+
+def device_identity(node):
+    name = os.path.basename(node or "")
+    if not name:
+        return None
+    subsystem = "hidraw" if name.startswith("hidraw") else "input"
+    path = f"{SYSFS}/class/{subsystem}/{name}/device"
+    if not os.path.exists(path):
+        return None
+    path = os.path.realpath(path)
+    devices = f"{SYSFS}/devices/"
+    parents = []
+    vendor = product = usb = hid = None
+    bus = None
+    while path.startswith(devices):
+        parents.append(path)
+        base = os.path.basename(path)
+        if hid is None and _HID_DIR.match(base):
+            # barramento:vendor:product.instância, também no Bluetooth
+            hid = path
+            bus, vid, pid = base.split(".", 1)[0].split(":")
+            vendor, product = int(vid, 16), int(pid, 16)
+        elif usb is None and os.path.exists(os.path.join(path, "idVendor")):
+            usb = path
+        path = os.path.dirname(path)
+    if vendor is None and parents:
+        # Nó de entrada fora do HID: o inputN informa id/vendor e id/product
+        vendor = _read_hex(os.path.join(parents[0], "id", "vendor"))
+        product = _read_hex(os.path.join(parents[0], "id", "product"))
+    if vendor is None and usb is not None:
+        vendor = _read_hex(os.path.join(usb, "idVendor"))
+        product = _read_hex(os.path.join(usb, "idProduct"))
+    # Só no barramento USB (0003) o aparelho é o dispositivo USB acima do
+    # HID; no Bluetooth (0005) o USB acima é o adaptador, comum a todos os
+    # controles pareados
+    if hid is not None and bus != "0003":
+        physical = hid
+    else:
+        physical = usb or hid
+    return DeviceIdentity(node, vendor, product, physical, parents)
+
+
+def physical_device(node):
+    # Caminho sysfs do aparelho dono do nó /dev: o dispositivo USB (tem
+    # idVendor) ou, no Bluetooth, o dispositivo HID. Os nós hidraw e event do
+    # mesmo apresentador compartilham esse ancestral; dois apresentadores
+    # iguais, não
+    identity = device_identity(node)
+    return identity.physical if identity else None
+
+
+class PacketDecoder:
+    # Tabela de 256 posições: byte de status → (botão, tipo)
+    __slots__ = ("size", "header", "trailer", "status_offset", "table")
+
+    def __init__(
+        self,
+        size,
+        header,
+        trailer,
+        status_offset,
+        single_buttons,
+        multiple_buttons,
+        aliases=None,
+    ):
+        self.size = size
+        self.header = header
+        self.trailer = trailer
+        self.status_offset = status_offset
+
+        table = [None] * 256
+        table[0] = PACKET_RELEASE
+        for status, button in single_buttons.items():
+            table[status] = (button, BUTTON_SINGLE)
+        for status, button in multiple_buttons.items():
+            table[status] = (button, BUTTON_MULTIPLE)
+        for status, target in (aliases or {}).items():
+            table[status] = table[target]
+        self.table = tuple(table)
+
+    def decode(self, data):
+        if (
+            len(data) != self.size
+            or data[0] != self.header
+            or data[-1] != self.trailer
+        ):
+            return None
+        return self.table[data[self.status_offset]]
+
+
+def use_monotonic_clock(fd):
+    # Timestamps do evdev no mesmo relógio do scheduler; False se o kernel
+    # não aceitar (fica no CLOCK_REALTIME e quem lê carimba na leitura)
+    try:
+        fcntl.ioctl(fd, EVIOCSCLOCKID, struct.pack("i", time.CLOCK_MONOTONIC))
+    except OSError:
+        return False
+    return True
+
+
+class HidrawReader:
+    # Lê relatórios inteiros de um hidraw em modo não bloqueante; quem espera
+    # por dados é o reator (ver reactor.py)
+    REPORT_SIZE = 64
+
+    def __init__(self, path, report_size=REPORT_SIZE):
+        self.path = path
+        self._buffer = bytearray(report_size)
+        self._view = memoryview(self._buffer)
+        self._fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK | os.O_CLOEXEC)
+
+    def fileno(self):
+        return self._fd
+
+    def read_available(self):
+        # Esvazia tudo o que o kernel já tem: um read() por relatório
+        chunks = []
+        while True:
+            try:
+                n = os.readv(self._fd, [self._buffer])
+            except BlockingIOError:
+                break
+            if n == 0:
+                raise OSError(errno.ENODEV, "Dispositivo removido", self.path)
+            chunks.append(bytes(self._view[:n]))
+        return chunks
+
+    def close(self):
+        try:
+            os.close(self._fd)
+        except OSError:
+            pass
+
+
+class ButtonState:
+    __slots__ = (
+        "start",
+        "second_click",
+        "long_pressed",
+        "repeat_active",
+        "hold",
+        "timer",
+        "repeat_timer",
+    )
+
+    def __init__(self, start, second_click=False, hold=False):
+        self.start = start
+        self.second_click = second_click
+        self.long_pressed = False
+        self.repeat_active = False
+        self.hold = hold  # criado por start_repeat, sem pressionar/soltar
+        self.timer = None
+        self.repeat_timer = None
+
+
+class GestureRecognizer:
+    # Clique, duplo clique, pressionamento longo e repetição a partir de
+    # eventos de pressionar/soltar com timestamp. Os prazos são contados a
+    # partir do instante do evento (não de quando o callback rodou) no relógio
+    # do scheduler, que pode ser virtual (ver scheduler.VirtualScheduler)
+    def __init__(
+        self,
+        scheduler,
+        action,
+        long_suffix="long",
+        release_suffix=None,
+        double_click_interval=0.4,
+        long_press_interval=0.6,
+        repeat_interval=0.05,
+        immediate=None,
+    ):
+        self.scheduler = scheduler
+        self.clock = scheduler.clock
+        self.action = action
+        self.long_suffix = long_suffix
+        self.release_suffix = release_suffix
+        self.double_click_interval = double_click_interval
+        self.long_press_interval = long_press_interval
+        self.repeat_interval = repeat_interval
+        # immediate(botão) → True se nada compete com o clique simples (sem
+        # duplo, longo, repetição nem soltar ligados): dispara no press
+        self.immediate = immediate
+
+        self._states = {}
+        self._pending = {}  # botão → estado com clique simples aguardando prazo
+        self._last_press = {}
+        self._last_release = {}
+        self._lock = threading.Lock()
+
+    def press(self, button, timestamp=None):
+        now = self.clock() if timestamp is None else timestamp
+        if self.immediate is not None and self.immediate(button):
+            with self._lock:
+                old = self._states.pop(button, None)
+                if old is not None:
+                    self._cancel(old)
+                pending = self._pending.pop(button, None)
+                if pending is not None:
+                    pending.timer.cancel()
+            if pending is not None and pending is not old:
+                self.action(button)  # clique anterior, ainda no prazo
+            self.action(button)
+            return
+        flush = None
+        with self._lock:
+            last_press = self._last_press.get(button)
+            second_click = (
+                last_press is not None
+                and 0 < now - last_press < self.double_click_interval
+                and button in self._last_release
+            )
+            self._last_press[button] = now
+
+            old = self._states.get(button)
+            if old is not None:
+                self._cancel(old)
+            pending = self._pending.pop(button, None)
+            if pending is not None:
+                pending.timer.cancel()
+                if not second_click and pending is not old:
+                    # Clique anterior já solto e fora da janela do duplo
+                    flush = button
+
+            state = ButtonState(now, second_click)
+            self._states[button] = state
+            if not second_click:
+                self._pending[button] = state
+            state.timer = self.scheduler.schedule_at(
+                now + self.long_press_interval, self._deadline, button, state
+            )
+        if flush:
+            self.action(flush)
+
+    def release(self, button, timestamp=None):
+        now = self.clock() if timestamp is None else timestamp
+        with self._lock:
+            state = self._states.get(button)
+            late = (
+                state is not None
+                and state.timer is not None
+                and not state.long_pressed
+                and now >= state.start + self.long_press_interval
+            )
+        if late:
+            # Soltou depois do prazo mas o timer ainda não rodou (atrasado):
+            # vale o timestamp, como se o prazo tivesse vencido antes
+            self._deadline(button, state)
+
+        fire = None
+        with self._lock:
+            state = self._states.pop(button, None)
+            if state is None:
+                return
+            if state.repeat_timer:
+                state.repeat_timer.cancel()
+
+            self._last_release[button] = now
+
+            # Duplo: segundo pressionamento dentro da janela (ver press),
+            # solto antes do prazo do longo
+            if state.second_click and not state.long_pressed:
+                fire = f"{button}++"
+                pending = self._pending.pop(button, None)
+                if pending is not None:
+                    pending.timer.cancel()
+            elif (state.long_pressed or state.repeat_active) and self.release_suffix:
+                fire = f"{button}+{self.release_suffix}"
+
+            # O prazo segue valendo só se ainda for emitir o clique simples
+            if state.timer and self._pending.get(button) is not state:
+                state.timer.cancel()
+
+        if fire:
+            self.action(fire)
+
+    def start_repeat(self, button, timestamp=None):
+        now = self.clock() if timestamp is None else timestamp
+        with self._lock:
+            state = self._states.get(button)
+            if state is None:
+                state = ButtonState(now, hold=True)
+                self._states[button] = state
+            if state.repeat_timer:
+                state.repeat_timer.cancel()
+            state.repeat_active = True
+        self._repeat(button, state, now)
+
+    def stop_repeat(self, button):
+        with self._lock:
+            state = self._states.get(button)
+            if state is None:
+                return False
+            state.repeat_active = False
+            timer, state.repeat_timer = state.repeat_timer, None
+            if state.hold:
+                del self._states[button]
+        if timer:
+            timer.cancel()
+            return True
+        return False
+
+    def cancel_all(self):
+        with self._lock:
+            for state in self._states.values():
+                self._cancel(state)
+            for state in self._pending.values():
+                self._cancel(state)
+            self._states.clear()
+            self._pending.clear()
+
+    def _cancel(self, state):
+        for timer in (state.timer, state.repeat_timer):
+            if timer:
+                timer.cancel()
+
+    def _deadline(self, button, state):
+        # Prazo do pressionamento longo: ainda pressionado vira longo (ou
+        # repetição, no segundo clique); já solto emite o clique simples
+        fire = None
+        repeat = False
+        with self._lock:
+            if self._states.get(button) is state and not state.long_pressed:
+                state.long_pressed = True
+                if self._pending.get(button) is state:
+                    del self._pending[button]
+                if state.second_click:
+                    state.repeat_active = repeat = True
+                else:
+                    fire = f"{button}+{self.long_suffix}"
+            elif self._pending.get(button) is state:
+                del self._pending[button]
+                fire = button
+
+        if repeat:
+            self._repeat(button, state, state.timer.when)
+        elif fire:
+            self.action(fire)
+
+    def _repeat(self, button, state, when):
+        with self._lock:
+            if self._states.get(button) is not state or not state.repeat_active:
+                return
+            # Não acumula atraso: o próximo vence um intervalo após o anterior
+            next_when = max(when + self.repeat_interval, self.clock())
+            state.repeat_timer = self.scheduler.schedule_at(
+                next_when, self._repeat, button, state, next_when
+            )
+        self.action(f"{button}+repeat")
+
+
+def competing_buttons(keys, long_suffix="long", release_suffix=None):
+    # (modo, visível) → botões com duplo, longo, repetição ou soltar no
+    # keymap: só nesses o clique simples espera o prazo do longo
+    suffixes = {long_suffix, "repeat", release_suffix}
+    table = {}
+    for gesture, mode, visible in keys:
+        if gesture.endswith("++"):
+            button = gesture[:-2]
+        else:
+            button, sep, suffix = gesture.partition("+")
+            if not sep or suffix not in suffixes:
+                continue
+        table.setdefault((mode, visible), set()).add(button)
+    return table
+
+
+class BasePointerDevice:
+    # Os atributos vêm do perfil do dispositivo (ver deviceprofile.py)
+    PROFILE_NAME = None
     VENDOR_ID = None
     PRODUCT_ID = None
+    COMPATIBLE_MODES = ()
+    SUPPORT_AUTO_MODE = False
+    DOUBLE_CLICK_INTERVAL = 0.4
+    LONG_PRESS_INTERVAL = 0.6
+    REPEAT_INTERVAL = 0.05
+    LONG_SUFFIX = "long"
+    RELEASE_SUFFIX = None  # sufixo emitido ao soltar após longo/repetição
+    KEYMAP_NAME = None  # pyspotlight/keymaps/<nome>.ini
+    KEY_BUTTON_MAP = {}  # código evdev → botão do keymap
+    FORWARD_KEYS = {}  # código evdev → ForwardRule
+    INTERFACE_FILTERS = {}  # tipo de nó → {atributo: valor}
+    JOYSTICK = None  # parâmetros do JoystickEngine, se houver analógico
+    JOYSTICK_AXES = {}  # código EV_ABS → eixo (0 = x, 1 = y)
+    SMOOTHING = None  # parâmetros do filtro One-Euro do movimento, se houver
+    _decoder = None  # PacketDecoder dos relatórios hidraw, se houver
+    _keymap = None
 
     def __init__(self, app_ctx, hidraw_path):
         self.path = hidraw_path
-        self._stop_event = threading.Event()
-        self._stop_hidraw_event = threading.Event()
-        self._event_thread = None
-        self._hidraw_thread = None
         self._ctx = app_ctx
+        identity = self.identity(hidraw_path)
+        # Uma instância por aparelho físico; o id também nomeia o ponteiro
+        # dele no overlay (ver SpotlightOverlayWindow.post_to)
+        self.physical_id = identity.physical if identity else None
+        self.pointer_id = self.physical_id
+        self._node_name = identity.name if identity else None
+        self._event_devices = {}  # fd → evdev.InputDevice, lidos pelo reator
+        self._realtime_fds = set()  # sem EVIOCSCLOCKID: usa hora da leitura
+        self._hidraw_reader = None
         self._device_name = None
         self._known_paths = []
+        self._recorder = None
+        self._unsynced = False  # eventos repassados aguardando SYN_REPORT
+        self._grabbed = True  # False: kernel entrega os eventos direto
+        self._packet_buffer = bytearray()  # resto de pacote hidraw incompleto
+        self._ultimo_botao_ativo = None
+        self._motion = [0, 0]  # REL_X/REL_Y do ponteiro próprio até o SYN
+        self._gestures = GestureRecognizer(
+            app_ctx.scheduler,
+            self.on_gesture,
+            long_suffix=self.LONG_SUFFIX,
+            release_suffix=self.RELEASE_SUFFIX,
+            double_click_interval=self.DOUBLE_CLICK_INTERVAL,
+            long_press_interval=self.LONG_PRESS_INTERVAL,
+            repeat_interval=self.REPEAT_INTERVAL,
+            immediate=self.click_is_final,
+        )
+        self._joystick = None
+        self._smoothing = None
+        self._settle_lock = threading.Lock()
+        self._settle_seq = 0  # timer de assentamento válido (ver _settle)
+        if self.SMOOTHING is not None:
+            self._smoothing = MotionSmoother(**self.SMOOTHING)
+        if self.JOYSTICK is not None:
+            self._joystick = JoystickEngine(
+                app_ctx.scheduler, self.emit_motion, **self.JOYSTICK
+            )
+        self._actions = bind_keymap(
+            self.keymap(app_ctx.log), self, log=app_ctx.log
+        )
+        self._hidden_grab_modes = self.hidden_grab_modes()
+        self._competing = self.competing_gestures()
+        if self.COMPATIBLE_MODES:
+            self._ctx.compatible_modes = list(self.COMPATIBLE_MODES)
+        if self.SUPPORT_AUTO_MODE:
+            self._ctx.support_auto_mode = True
+
+        # Replay offline: não toca nos dispositivos reais
+        if getattr(app_ctx, "offline", False):
+            return
 
         self.add_known_path(hidraw_path)
-        for device in self.find_all_event_devices_for_known():
+        # Os nós event já foram encontrados ao iniciar o monitoramento
+        for device in list(self._event_devices.values()):
             self.add_known_path(device.path)
 
     def start_event_blocking(self):
-        if not self._event_thread or not self._event_thread.is_alive():
-            self._stop_event.clear()
-            devs = self.find_all_event_devices_for_known()
-            if devs:
-                self._event_thread = threading.Thread(
-                    target=self.read_input_events,
-                    args=(devs,),
-                    daemon=True,
-                )
-                self._event_thread.start()
-            else:
+        if self._event_devices:
+            return
+        devs = self.find_all_event_devices_for_known()
+        if not devs:
+            self._ctx.log(
+                "* Nenhum dispositivo de entrada conhecido encontrado para bloquear."
+            )
+            return
+
+        for dev in devs:
+            self.attach_event_device(dev, grab=True)
+
+        self._grabbed = True
+        self.update_grab()
+
+    def attach_event_device(self, dev, grab):
+        if grab:
+            try:
+                dev.grab()
+            except Exception as e:
                 self._ctx.log(
-                    "* Nenhum dispositivo de entrada conhecido encontrado para bloquear."
+                    f"* Erro ao monitorar dispositivo {dev.path}: {e}. Tente executar como root ou ajuste as regras udev."
                 )
+                dev.close()
+                return False
+        if not use_monotonic_clock(dev.fd):
+            self._realtime_fds.add(dev.fd)
+        self._event_devices[dev.fd] = dev
+        self._read_axis_ranges(dev)
+        self._ctx.reactor.register(dev.fd, lambda dev=dev: self.read_input_events(dev))
+        self._ctx.log(f"* Monitorado: {dev.path}")
+        return True
+
+    def attach_path(self, path):
+        # Nó que apareceu depois (hotplug) num aparelho já monitorado: entra
+        # sem reabrir nem varrer os demais
+        if os.path.basename(path).startswith("hidraw"):
+            if self._decoder is not None and self._hidraw_reader is None:
+                self.path = path
+                self.watch_hidraw(path)
+            return
+        if any(dev.path == path for dev in self._event_devices.values()):
+            return
+        try:
+            dev = evdev.InputDevice(path)
+        except Exception as e:
+            self._ctx.log(f"* Erro ao acessar {path}: {e}")
+            return
+        self.attach_event_device(dev, grab=self._grabbed)
+
+    def detach_path(self, path):
+        for fd, dev in list(self._event_devices.items()):
+            if dev.path == path:
+                del self._event_devices[fd]
+                self._realtime_fds.discard(fd)
+                self._ctx.reactor.call_soon(self._close_source, fd, dev, True)
+        reader = self._hidraw_reader
+        if reader is not None and reader.path == path:
+            self.stop_hidraw_monitoring()
+
+    def _read_axis_ranges(self, dev):
+        # Faixa real de cada eixo do analógico (EVIOCGABS)
+        if self._joystick is None:
+            return
+        for code, axis in self.JOYSTICK_AXES.items():
+            try:
+                info = dev.absinfo(code)
+            except OSError:
+                continue
+            self._joystick.set_range(axis, info.min, info.max)
+
+    def hidden_grab_modes(self):
+        # Modos em que um botão lido do evdev tem ação com o overlay oculto;
+        # fora deles, com o overlay oculto, o dispositivo fica sem grab
+        evdev_buttons = set(self.KEY_BUTTON_MAP.values())
+        return {
+            mode
+            for (gesture, mode, visible) in self._actions
+            if not visible and gesture.partition("+")[0] in evdev_buttons
+        }
+
+    def competing_gestures(self):
+        return competing_buttons(self._actions, self.LONG_SUFFIX, self.RELEASE_SUFFIX)
+
+    def click_is_final(self, button):
+        ow = self._ctx.overlay_window
+        if ow is None:
+            return False
+        pointer = self.pointer_id
+        competing = self._competing.get(
+            (ow.current_mode(pointer), ow.is_active(pointer)), ()
+        )
+        return button not in competing
+
+    def wants_grab(self):
+        ow = self._ctx.overlay_window
+        if ow is None:
+            return True
+        pointer = self.pointer_id
+        return (
+            ow.is_active(pointer)
+            or ow.current_mode(pointer) in self._hidden_grab_modes
+        )
+
+    def update_grab(self):
+        # Chamado quando o modo ou a visibilidade do overlay mudam
+        if self._event_devices and self.wants_grab() != self._grabbed:
+            self._ctx.reactor.call_soon(self._apply_grab)
+
+    def _apply_grab(self):
+        grab = self.wants_grab()
+        if grab == self._grabbed:
+            return
+        for dev in self._event_devices.values():
+            try:
+                dev.grab() if grab else dev.ungrab()
+            except OSError as e:
+                self._ctx.log(f"* Erro ao alternar grab de {dev.path}: {e}")
+        with _UI_LOCK:
+            self._grabbed = grab
+            self._unsynced = False
+        self._ctx.log(
+            f"* {self.display_name()}: "
+            + ("eventos interceptados" if grab else "eventos nativos (sem grab)")
+        )
 
     def find_all_event_devices_for_known(self):
         devices = []
         for path in glob.glob("/dev/input/event*"):
-            if self.__class__.is_known_device(path):
+            identity = self.identity(path)
+            if identity is None:
+                continue
+            if self.physical_id and identity.physical != self.physical_id:
+                continue  # outro aparelho do mesmo modelo
+            if self.matches(identity):
                 try:
                     devices.append(evdev.InputDevice(path))
                     self._ctx.log(f"* Encontrado device de entrada: {path}")
@@ -63,32 +695,66 @@ class BasePointerDevice(metaclass=SingletonMeta):
         return devices
 
     def monitor(self):
+        self._ctx.register_device(self)
         self.start_event_blocking()
         self.start_hidraw_monitoring()
 
     def start_hidraw_monitoring(self):
-        pass
+        if self._decoder is not None:
+            self.watch_hidraw(self.path)
+
+    def watch_hidraw(self, path):
+        # Abre o hidraw e entrega os relatórios pelo reator, sem thread própria
+        if self._hidraw_reader or not path or not os.path.exists(path):
+            return
+        try:
+            self._hidraw_reader = HidrawReader(path)
+        except PermissionError:
+            self._ctx.log(
+                f"* Sem permissão para acessar {path} (tente ajustar udev ou rodar com sudo)"
+            )
+            return
+        self._ctx.reactor.register(
+            self._hidraw_reader.fileno(), self.read_hidraw_reports
+        )
 
     def stop_hidraw_monitoring(self):
-        self._stop_hidraw_event.set()
+        reader, self._hidraw_reader = self._hidraw_reader, None
+        if reader:
+            # Fecha na thread do reator, depois de sair do epoll
+            self._ctx.reactor.call_soon(self._close_source, reader.fileno(), reader)
 
     def stop_event_blocking(self):
-        self._stop_event.set()
-        if self._event_thread and self._event_thread.is_alive():
-            self._event_thread.join(
-                timeout=1
-            )  # espera a thread encerrar (timeout opcional)
+        devices, self._event_devices = self._event_devices, {}
+        self._realtime_fds.clear()
+        for fd, dev in devices.items():
+            self._ctx.reactor.call_soon(self._close_source, fd, dev, True)
+
+    def _close_source(self, fd, source, ungrab=False):
+        self._ctx.reactor.unregister(fd)
+        if ungrab:
+            try:
+                source.ungrab()
+            except Exception:
+                pass
+        try:
+            source.close()
+        except Exception:
+            pass
 
     def stop(self):
+        self._ctx.unregister_device(self)
         self.stop_event_blocking()
         self.stop_hidraw_monitoring()
+        self.stop_recording()
+        self._gestures.cancel_all()
+        if self._joystick is not None:
+            self._joystick.stop()
+        with self._settle_lock:
+            self._settle_seq += 1  # descarta o assentamento pendente
 
     def ensure_monitoring(self):
-        if (
-            not hasattr(self, "_event_thread")
-            or not self._event_thread
-            or not self._event_thread.is_alive()
-        ):
+        if not self._event_devices:
             self._ctx.log(f"* Monitorando {self.display_name()}")
             self.monitor()
 
@@ -102,7 +768,10 @@ class BasePointerDevice(metaclass=SingletonMeta):
         self.cleanup_known_paths()
         if path and path not in self._known_paths and os.path.exists(path):
             self._known_paths.append(path)
-            self.ensure_monitoring()
+            if len(self._known_paths) > 1:
+                self.attach_path(path)  # nó novo de um aparelho já monitorado
+            else:
+                self.ensure_monitoring()
             return True
         return False
 
@@ -110,6 +779,7 @@ class BasePointerDevice(metaclass=SingletonMeta):
         if path in self._known_paths:
             self._ctx.log(f"- Removendo path {path} de {self.__class__.__name__}")
             self._known_paths.remove(path)
+            self.detach_path(path)
         return len(self._known_paths) == 0  # retorna True se ficou vazio
 
     # def display_name(self):
@@ -123,109 +793,304 @@ class BasePointerDevice(metaclass=SingletonMeta):
         return self.display_name()
 
     def display_name(self):
-        desc = getattr(self.__class__, "PRODUCT_DESCRIPTION", None)
-        if desc:
-            return desc
+        # Em memória: o nome do sysfs veio com a identificação do nó (ou do
+        # cache de identidades, ver devicecache.py)
+        if self._device_name is None:
+            self._device_name = (
+                getattr(self.__class__, "PRODUCT_DESCRIPTION", None)
+                or self._node_name
+                or self.__class__.__name__  # Fallback genérico
+            )
+        return self._device_name
 
-        try:
-            devname = os.path.basename(self.path or "")
-            if devname.startswith("event"):
-                path = f"/sys/class/input/{devname}/device/name"
-                if os.path.exists(path):
-                    return open(path).read().strip()
-
-            elif devname.startswith("hidraw"):
-                path = f"/sys/class/hidraw/{devname}/device/uevent"
-                if os.path.exists(path):
-                    with open(path) as f:
-                        for line in f:
-                            if line.startswith("HID_NAME="):
-                                return line.strip().split("=", 1)[1]
-        except Exception as e:
-            self._ctx.log(f"[display_name] Erro ao obter nome: {e}")
+    def identity(self, path):
+        cache = self._ctx.device_cache
+        if cache is not None:
+            return cache.identity(path)
+        return device_identity(path)
 
-        return self.__class__.__name__  # Fallback genérico
+    @classmethod
+    def decoder(cls):
+        return cls._decoder
 
     @classmethod
-    def device_filter(cls, device_info, udevadm_output) -> bool:
+    def device_filter(cls, identity) -> bool:
+        for kind, attrs in cls.INTERFACE_FILTERS.items():
+            if kind in identity.node:
+                return all(
+                    identity.attr(attr) == value for attr, value in attrs.items()
+                )
         return True
 
+    @classmethod
+    def matches(cls, identity):
+        return (
+            identity is not None
+            and identity.vendor == cls.VENDOR_ID
+            and identity.product == cls.PRODUCT_ID
+            and cls.device_filter(identity)
+        )
+
     @classmethod
     def is_known_device(cls, device_info):
-        try:
-            output = subprocess.check_output(
-                ["udevadm", "info", "-a", "-n", device_info], text=True
-            ).lower()
-            vid = f"{cls.VENDOR_ID:04x}"
-            pid = f"{cls.PRODUCT_ID:04x}"
-            known_device = vid in output and pid in output
-            return known_device and cls.device_filter(device_info, output)
-        except subprocess.CalledProcessError:
-            return False
+        return cls.matches(device_identity(device_info))
+
+    # Escrita no uinput em frames: eventos com syn=False e um único SYN no
+    # fim. Pressionar e soltar ficam em frames separados para que nenhum
+    # cliente descarte a tecla
 
     def emit_key_press(self, key):
         ui = self._ctx.ui
-        ui.emit(key, 1)  # Pressiona
-        ui.emit(key, 0)  # Solta
+        with _UI_LOCK:
+            ui.emit(key, 1)  # Pressiona
+            ui.emit(key, 0)  # Solta
 
     def emit_key_chord(self, keys):
         ui = self._ctx.ui
-        ui.emit(keys[0], 1)  # Pressiona primeira tecla, ex: SHIFT
-        ui.emit(keys[1], 1)  # Pressiona segunda tecla ex: F5
-        ui.emit(keys[1], 0)  # Solta segunda tecla
-        ui.emit(keys[0], 0)  # Solta primeira tecla
+        with _UI_LOCK:
+            # Todas as teclas descem no mesmo frame, ex: SHIFT+F5
+            for key in keys:
+                ui.emit(key, 1, syn=False)
+            ui.syn()
+            for key in reversed(keys):
+                ui.emit(key, 0, syn=False)
+            ui.syn()
+
+    def forward_event(self, event):
+        # Repassa sem sincronizar; o SYN_REPORT da origem fecha o frame.
+        # Sem grab o evento já chegou nativo: repassar duplicaria
+        if not self._grabbed:
+            return
+        with _UI_LOCK:
+            self._ctx.ui.emit((event.type, event.code), event.value, syn=False)
+            self._unsynced = True
+
+    def emit_motion(self, dx, dy, syn=True):
+        # Movimento gerado (analógico) ou filtrado aqui. Sem syn, entra no
+        # frame repassado em aberto e o SYN_REPORT da origem o fecha
+        if self.owns_motion():
+            self._ctx.overlay_window.post_to(self.pointer_id, "move_pointer", dx, dy)
+            return
+        ui = self._ctx.ui
+        with _UI_LOCK:
+            if dx:
+                ui.emit((ec.EV_REL, ec.REL_X), dx, syn=False)
+            if dy:
+                ui.emit((ec.EV_REL, ec.REL_Y), dy, syn=False)
+            if syn:
+                ui.syn()
+            else:
+                self._unsynced = True
+
+    def sync_events(self, timestamp=None):
+        motion = self._motion
+        if motion[0] or motion[1]:
+            dx, dy = motion
+            motion[0] = motion[1] = 0
+            if self._smoothing is not None:
+                if timestamp is None:
+                    timestamp = self._gestures.clock()
+                with self._settle_lock:
+                    dx, dy = self._smoothing.filter(dx, dy, timestamp)
+                    self._schedule_settle(timestamp + SETTLE_DELAY)
+            if dx or dy:
+                self.emit_motion(dx, dy, syn=False)
+        if self._unsynced:
+            with _UI_LOCK:
+                self._unsynced = False
+                self._ctx.ui.syn()
+
+    def _schedule_settle(self, when):
+        # Chamado com _settle_lock: um relatório novo invalida o timer anterior
+        self._settle_seq += 1
+        if self._smoothing.pending():
+            self._ctx.scheduler.schedule_at(when, self._settle, when, self._settle_seq)
+
+    def _settle(self, when, seq):
+        # Mão parada: leva o ponteiro filtrado até a posição real
+        with self._settle_lock:
+            if seq != self._settle_seq:
+                return
+            dx, dy, more = self._smoothing.settle(when)
+            if more:
+                self._schedule_settle(when + SETTLE_INTERVAL)
+        if dx or dy:
+            self.emit_motion(dx, dy)
 
     def handle_event(self, event):
-        pass
+        if event.type == ec.EV_REL:  # Movimento de Mouse
+            if event.code <= ec.REL_Y and (
+                (self._smoothing is not None and self._grabbed)
+                or self.owns_motion()
+            ):
+                # Filtrado ou do ponteiro próprio: soma até o SYN_REPORT
+                self._motion[event.code] += event.value
+            else:
+                # Repassa evento virtual
+                self.forward_event(event)
 
-    def read_input_events(self, devices):
-        while not self._stop_event.is_set():
-            fd_para_dev = {}
-            for dev in devices:
-                try:
-                    dev.grab()
-                    fd_para_dev[dev.fd] = dev
-                    self._ctx.log(f"* Monitorado: {dev.path}")
-                except Exception as e:
-                    self._ctx.log(
-                        f"* Erro ao monitorar dispositivo {dev.path}: {e}. Tente executar como root ou ajuste as regras udev."
-                    )
-            self._ctx.log("* Monitorando dispositivos...")
+        elif event.type == ec.EV_SYN:
+            if event.code == ec.SYN_REPORT:
+                self.sync_events(event.timestamp())
 
-            try:
-                while True:
-                    r, _, _ = select.select(fd_para_dev, [], [], 0.1)
-                    for fd in r:
-                        dev = fd_para_dev.get(fd)
-                        if dev is None:
-                            continue
-                        try:
-                            for event in dev.read():
-                                self.handle_event(event)
-
-                        except OSError as e:
-                            if e.errno == 19:  # No such device
-                                self._ctx.log(f"- Dispositivo desconectado: {dev.path}")
-                                # Remove dispositivo da lista para não monitorar mais
-                                fd_para_dev.pop(fd, None)
-                                try:
-                                    dev.ungrab()
-                                except Exception:
-                                    pass
-                                # Opcional: se não há mais dispositivos, pode encerrar ou esperar
-                                if not fd_para_dev:
-                                    self._ctx.log(
-                                        "* Nenhum dispositivo restante para monitorar. Encerrando thread."
-                                    )
-                                    return
-                            else:
-                                raise
-
-            except KeyboardInterrupt:
-                self._ctx.log("\n* Encerrando monitoramento.")
-            finally:
-                for dev in devices:
-                    try:
-                        dev.ungrab()
-                    except Exception:
-                        pass
+        elif event.type == ec.EV_ABS:
+            axis = self.JOYSTICK_AXES.get(event.code)
+            if axis is not None and self._joystick is not None:
+                self._joystick.update(axis, event.value, event.timestamp())
+
+        elif event.type == ec.EV_KEY:
+            code = event.code
+            rule = self.FORWARD_KEYS.get(code)
+            if rule is not None:
+                self.forward_key(event, rule)
+
+            button = self.KEY_BUTTON_MAP.get(code)
+            if button:
+                if event.value == 1:
+                    self._gestures.press(button, event.timestamp())
+                elif event.value == 0:
+                    self._gestures.release(button, event.timestamp())
+
+    def owns_motion(self):
+        ow = self._ctx.overlay_window
+        return ow is not None and ow.owns_motion(self.pointer_id)
+
+    def forward_key(self, event, rule):
+        ow = self._ctx.overlay_window
+        if ow is None or not ow.is_active(self.pointer_id):
+            if not rule.hidden:
+                return
+        elif ow.current_mode(self.pointer_id) not in rule.modes:
+            return
+        self.forward_event(event)
+        if rule.slide and ow and event.value == 1:
+            ow.notify_slide_change()
+
+    def split_pacotes(self, chunk):
+        # Relatórios podem chegar colados ou partidos: corta no terminador
+        buffer = self._packet_buffer
+        buffer += chunk
+        trailer = self._decoder.trailer
+        start = 0
+        while True:
+            end = buffer.find(trailer, start)
+            if end < 0:
+                break
+            yield bytes(buffer[start : end + 1])
+            start = end + 1
+        del buffer[:start]
+
+    def handle_hidraw_report(self, chunk, timestamp=None):
+        if self._decoder is None:
+            return
+        for pacote in self.split_pacotes(chunk):
+            self.processa_pacote_hid(pacote, timestamp)
+
+    def processa_pacote_hid(self, data, timestamp=None):
+        entry = self._decoder.decode(data)
+        if entry is None:
+            return
+
+        if entry is PACKET_RELEASE:
+            # Somente libera o botão que estava ativo
+            if self._ultimo_botao_ativo:
+                self._gestures.release(self._ultimo_botao_ativo, timestamp)
+                self._ultimo_botao_ativo = None
+            return
+
+        button, kind = entry
+
+        # Estes botoes executam diretamente, sem tratamento
+        if kind == BUTTON_SINGLE:
+            self.executa_acao(button)
+        else:
+            # Se for um novo botão e havia outro ativo, libera o anterior
+            if self._ultimo_botao_ativo and self._ultimo_botao_ativo != button:
+                self._gestures.release(self._ultimo_botao_ativo, timestamp)
+
+            # Atualiza botão atualmente ativo
+            self._ultimo_botao_ativo = button
+
+            # Processa pressão do novo botão
+            self._gestures.press(button, timestamp)
+
+    @classmethod
+    def keymap(cls, log=None):
+        # Compilado uma vez por classe de dispositivo
+        if cls.__dict__.get("_keymap") is None:
+            cls._keymap = load_keymap(cls.KEYMAP_NAME, log) if cls.KEYMAP_NAME else {}
+        return cls._keymap
+
+    def on_gesture(self, name):
+        # Resolvido a cada chamada para o replay poder instrumentar a ação
+        self.executa_acao(name)
+
+    def executa_acao(self, button):
+        ow = self._ctx.overlay_window
+        pointer = self.pointer_id
+        action = self._actions.get(
+            (button, ow.current_mode(pointer), ow.is_active(pointer))
+        )
+        if action is not None:
+            action()
+
+    def start_recording(self, path):
+        from .recorder import InputRecorder
+
+        self.stop_recording()
+        self._recorder = InputRecorder(path)
+        self._ctx.log(f"* Gravando eventos de {self.display_name()} em {path}")
+
+    def stop_recording(self):
+        recorder, self._recorder = self._recorder, None
+        if recorder:
+            recorder.close()
+
+    def read_input_events(self, dev):
+        # Chamado pelo reator quando o fd do evdev tem dados
+        realtime = dev.fd in self._realtime_fds
+        # Atraso do primeiro evento da leitura (só com timestamp monotônico)
+        jitter = None if realtime else self._ctx.input_jitter
+        try:
+            for event in dev.read():
+                if realtime:
+                    now = self._gestures.clock()
+                    event.sec, event.usec = int(now), int(now % 1 * 1e6)
+                elif jitter is not None:
+                    jitter.add(self._gestures.clock() - event.timestamp())
+                    jitter = None
+                if self._recorder:
+                    self._recorder.record_event(event)
+                self.handle_event(event)
+        except BlockingIOError:
+            pass
+        except OSError as e:
+            if e.errno != errno.ENODEV:
+                raise
+            self._ctx.log(f"- Dispositivo desconectado: {dev.path}")
+            self._realtime_fds.discard(dev.fd)
+            if self._event_devices.pop(dev.fd, None) is not None:
+                self._close_source(dev.fd, dev, True)
+            if not self._event_devices:
+                self._ctx.log("* Nenhum dispositivo restante para monitorar.")
+
+    def read_hidraw_reports(self):
+        # Chamado pelo reator quando o hidraw tem relatórios
+        reader = self._hidraw_reader
+        if reader is None:
+            return
+        try:
+            chunks = reader.read_available()
+            timestamp = self._gestures.clock()
+        except OSError as e:
+            if e.errno in (errno.EIO, errno.ENODEV):
+                self._ctx.log("- Dispositivo desconectado ou erro de I/O")
+            else:
+                self._ctx.log(f"* Erro em {reader.path}: {e}")
+            self._hidraw_reader = None
+            self._close_source(reader.fileno(), reader)
+            return
+        for chunk in chunks:
+            if self._recorder:
+                self._recorder.record_hidraw(chunk, timestamp)
+            self.handle_hidraw_report(chunk, timestamp)
@@ -0,0 +1,99 @@
+# reactor.py
+#
+# Reator de E/S único (epoll via selectors): dono de todos os fds de evdev,
+# hidraw e do socket netlink do udev. Uma thread, não importa quantos
+# dispositivos estejam conectados.
+
+import os
+import threading
+import selectors
+from collections import deque
+
+
+class IOReactor:
+    def __init__(self, log_function=None, thread_setup=None):
+        self._log = log_function
+        self._thread_setup = thread_setup  # prioridade/afinidade da thread
+        self._selector = selectors.DefaultSelector()
+        self._wakeup_fd = os.eventfd(0, os.EFD_NONBLOCK | os.EFD_CLOEXEC)
+        self._selector.register(self._wakeup_fd, selectors.EVENT_READ, None)
+        self._calls = deque()
+        self._thread = None
+        self._running = False
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._running = True
+        self._thread = threading.Thread(
+            target=self._run, daemon=True, name="pyspotlight-io"
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self._wakeup()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1)
+
+    def in_reactor_thread(self):
+        return self._thread is threading.current_thread()
+
+    def call_soon(self, fn, *args):
+        # Seguro a partir de qualquer thread
+        self._calls.append((fn, args))
+        self._wakeup()
+
+    def register(self, fileobj, callback):
+        if self.in_reactor_thread():
+            self._register(fileobj, callback)
+        else:
+            self.call_soon(self._register, fileobj, callback)
+
+    def unregister(self, fileobj):
+        if self.in_reactor_thread():
+            self._unregister(fileobj)
+        else:
+            self.call_soon(self._unregister, fileobj)
+
+    def _register(self, fileobj, callback):
+        try:
+            self._selector.register(fileobj, selectors.EVENT_READ, callback)
+        except KeyError:
+            self._selector.modify(fileobj, selectors.EVENT_READ, callback)
+
+    def _unregister(self, fileobj):
+        try:
+            self._selector.unregister(fileobj)
+        except (KeyError, ValueError):
+            pass
+
+    def _wakeup(self):
+        try:
+            os.eventfd_write(self._wakeup_fd, 1)
+        except OSError:
+            pass
+
+    def _run(self):
+        if self._thread_setup:
+            self._dispatch(self._thread_setup)
+        while self._running:
+            for key, _ in self._selector.select():
+                if key.data is None:
+                    try:
+                        os.eventfd_read(self._wakeup_fd)
+                    except BlockingIOError:
+                        pass
+                    continue
+                self._dispatch(key.data)
+
+            while self._calls:
+                fn, args = self._calls.popleft()
+                self._dispatch(fn, *args)
+
+    def _dispatch(self, fn, *args):
+        try:
+            fn(*args)
+        except Exception as e:
+            if self._log:
+                self._log(f"[ERRO] Reator: {e}")
@@ -0,0 +1,274 @@
+# recorder.py
+#
+# Gravação e reprodução dos fluxos brutos (relatórios hidraw e eventos evdev)
+# para reproduzir bugs de temporização e medir os handlers sem o hardware.
+#
+# Formato: cabeçalho MAGIC seguido de registros
+#   hidraw: <B tipo> <d timestamp> <H tamanho> <bytes>
+#   evdev:  <B tipo> <d timestamp> <H type> <H code> <i value>
+
+import time
+import struct
+import threading
+
+MAGIC = b"PYSPREC1"
+RECORD_HIDRAW = 1
+RECORD_EVDEV = 2
+
+_HEADER = struct.Struct("<Bd")
+_HIDRAW = struct.Struct("<H")
+_EVDEV = struct.Struct("<HHi")
+
+
+class InputRecorder:
+    def __init__(self, path):
+        self._file = open(path, "wb")
+        self._file.write(MAGIC)
+        self._lock = threading.Lock()
+
+    def record_hidraw(self, data, timestamp=None):
+        if timestamp is None:
+            # CLOCK_MONOTONIC, como os eventos evdev após EVIOCSCLOCKID
+            timestamp = time.monotonic()
+        with self._lock:
+            self._file.write(_HEADER.pack(RECORD_HIDRAW, timestamp))
+            self._file.write(_HIDRAW.pack(len(data)))
+            self._file.write(data)
+
+    def record_event(self, event):
+        with self._lock:
+            self._file.write(_HEADER.pack(RECORD_EVDEV, event.timestamp()))
+            self._file.write(_EVDEV.pack(event.type, event.code, event.value))
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+def read_records(path):
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} não é uma gravação do PySpotlight")
+        while True:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return
+            kind, timestamp = _HEADER.unpack(header)
+            if kind == RECORD_HIDRAW:
+                (length,) = _HIDRAW.unpack(f.read(_HIDRAW.size))
+                yield kind, timestamp, f.read(length)
+            elif kind == RECORD_EVDEV:
+                yield kind, timestamp, _EVDEV.unpack(f.read(_EVDEV.size))
+            else:
+                raise ValueError(f"Registro desconhecido ({kind}) em {path}")
+
+
+def record_devices(paths, out_path, duration=None, stop_event=None):
+    # Grava direto dos nós (/dev/hidraw*, /dev/input/event*), sem processar
+    import select
+    import evdev
+    from .pointerdevice import HidrawReader, use_monotonic_clock
+
+    recorder = InputRecorder(out_path)
+    readers = {}
+    realtime_fds = set()  # sem EVIOCSCLOCKID: usa hora da leitura
+    try:
+        for path in paths:
+            if "hidraw" in path:
+                reader = HidrawReader(path)
+                readers[reader.fileno()] = reader
+            else:
+                dev = evdev.InputDevice(path)
+                readers[dev.fd] = dev
+                if not use_monotonic_clock(dev.fd):
+                    realtime_fds.add(dev.fd)
+
+        deadline = time.monotonic() + duration if duration else None
+        count = 0
+        while not (stop_event and stop_event.is_set()):
+            timeout = 0.1
+            if deadline is not None:
+                timeout = min(timeout, deadline - time.monotonic())
+                if timeout <= 0:
+                    break
+            r, _, _ = select.select(readers, [], [], timeout)
+            for fd in r:
+                source = readers[fd]
+                if isinstance(source, HidrawReader):
+                    for chunk in source.read_available():
+                        recorder.record_hidraw(chunk)
+                        count += 1
+                else:
+                    for event in source.read():
+                        if fd in realtime_fds:
+                            now = time.monotonic()
+                            event.sec, event.usec = int(now), int(now % 1 * 1e6)
+                        recorder.record_event(event)
+                        count += 1
+        return count
+    finally:
+        recorder.close()
+        for source in readers.values():
+            source.close()
+
+
+class _StageTimer:
+    __slots__ = ("samples",)
+
+    def __init__(self):
+        self.samples = []
+
+    def summary(self):
+        if not self.samples:
+            return None
+        s = sorted(self.samples)
+        n = len(s)
+        return {
+            "count": n,
+            "mean": sum(s) / n,
+            "p50": s[n // 2],
+            "p99": s[min(n - 1, int(n * 0.99))],
+            "max": s[-1],
+        }
+
+
+class NullUinput:
+    # uinput de mentira: só conta o que seria emitido
+    def __init__(self):
+        self.emitted = 0
+        self.syncs = 0
+
+    def emit(self, event, value, syn=True):
+        self.emitted += 1
+        if syn:
+            self.syncs += 1
+
+    def syn(self):
+        self.syncs += 1
+
+
+class NullOverlay:
+    # Overlay sem janela: aceita qualquer ação e só conta as chamadas
+    def __init__(self, mode=0, visible=False):
+        self.mode = mode
+        self.visible = visible
+        self.calls = 0
+
+    def current_mode(self, pointer=None):
+        return self.mode
+
+    def isVisible(self):
+        return self.visible
+
+    def is_active(self, pointer=None):
+        return self.visible
+
+    def owns_motion(self, pointer=None):
+        return False
+
+    def auto_mode_enabled(self):
+        return False
+
+    def __getattr__(self, name):
+        def action(*args, **kwargs):
+            self.calls += 1
+
+        return action
+
+
+class ReplayContext:
+    offline = True
+    input_jitter = None
+    device_cache = None
+
+    def __init__(self, overlay=None, scheduler=None):
+        self.ui = NullUinput()
+        self.overlay_window = overlay or NullOverlay()
+        self.compatible_modes = []
+        self.support_auto_mode = False
+        self._scheduler = scheduler
+
+    @property
+    def scheduler(self):
+        if self._scheduler is None:
+            from .scheduler import Scheduler
+
+            self._scheduler = Scheduler()
+            self._scheduler.start()
+        return self._scheduler
+
+    def log(self, message):
+        pass
+
+    def overlay_state_changed(self):
+        pass
+
+    def primary_pointer(self):
+        return None
+
+    def compatible_modes_for(self, pointer_id):
+        return self.compatible_modes
+
+    def show_info(self, message):
+        pass
+
+
+class InputReplayer:
+    def __init__(self, path):
+        self.records = list(read_records(path))
+
+    def replay(self, device, realtime=False):
+        from evdev.events import InputEvent
+
+        stages = {"hidraw": _StageTimer(), "evdev": _StageTimer()}
+        actions = _StageTimer()
+        original = device.executa_acao
+
+        def timed_action(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                actions.samples.append(time.perf_counter() - start)
+
+        device.executa_acao = timed_action
+        # Com VirtualScheduler os timers de gestos andam no tempo da gravação
+        scheduler = device._ctx.scheduler
+        advance = getattr(scheduler, "advance", None)
+        try:
+            first_ts = self.records[0][1] if self.records else 0.0
+            # Relógio real: traz os timestamps gravados para o "agora"
+            offset = 0.0 if advance else scheduler.clock() - first_ts
+            wall_start = time.perf_counter()
+            for kind, timestamp, payload in self.records:
+                timestamp += offset
+                if advance:
+                    advance(timestamp)
+                elif realtime:
+                    delay = (timestamp - offset - first_ts) - (
+                        time.perf_counter() - wall_start
+                    )
+                    if delay > 0:
+                        time.sleep(delay)
+                start = time.perf_counter()
+                if kind == RECORD_HIDRAW:
+                    device.handle_hidraw_report(payload, timestamp)
+                    stages["hidraw"].samples.append(time.perf_counter() - start)
+                else:
+                    sec = int(timestamp)
+                    usec = int(round((timestamp - sec) * 1e6))
+                    device.handle_event(InputEvent(sec, usec, *payload))
+                    stages["evdev"].samples.append(time.perf_counter() - start)
+            if advance and self.records:
+                advance(self.records[-1][1] + 60.0)  # esgota prazos pendentes
+            elapsed = time.perf_counter() - wall_start
+        finally:
+            del device.executa_acao
+
+        stages["acao"] = actions
+        return {
+            "events": len(self.records),
+            "elapsed": elapsed,
+            "stages": {name: t.summary() for name, t in stages.items()},
+        }
@@ -0,0 +1,139 @@
+# scheduler.py
+#
+# Agendador único (heap) para os temporizadores de gestos: clique pendente,
+# pressionamento longo e repetição. Substitui um threading.Timer (uma thread
+# do SO) por agendamento.
+
+import time
+import heapq
+import threading
+from itertools import count
+
+
+class TimerHandle:
+    __slots__ = ("when", "fn", "args", "cancelled")
+
+    def __init__(self, when, fn, args):
+        self.when = when
+        self.fn = fn
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        # Cancelamento preguiçoso: a entrada sai do heap quando vencer
+        self.cancelled = True
+
+
+class Scheduler:
+    def __init__(self, log_function=None, clock=time.monotonic, thread_setup=None):
+        self._log = log_function
+        self.clock = clock
+        self._thread_setup = thread_setup  # prioridade/afinidade da thread
+        self.jitter = None  # performance.JitterStats: atraso de cada disparo
+        self._heap = []
+        self._seq = count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._running = True
+        self._thread = threading.Thread(
+            target=self._run, daemon=True, name="pyspotlight-timers"
+        )
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._heap.clear()
+            self._cond.notify()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1)
+
+    def schedule(self, delay, fn, *args):
+        return self.schedule_at(self.clock() + delay, fn, *args)
+
+    def schedule_at(self, when, fn, *args):
+        # "when" no mesmo relógio de self.clock (monotônico)
+        handle = TimerHandle(when, fn, args)
+        with self._cond:
+            heapq.heappush(self._heap, (handle.when, next(self._seq), handle))
+            # Só acorda a thread se o novo timer passou a ser o primeiro
+            if self._heap[0][2] is handle:
+                self._cond.notify()
+        return handle
+
+    def _run(self):
+        if self._thread_setup:
+            try:
+                self._thread_setup()
+            except Exception as e:
+                if self._log:
+                    self._log(f"[ERRO] Timer: {e}")
+        while True:
+            with self._cond:
+                while self._running:
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    when, _, handle = self._heap[0]
+                    if handle.cancelled:
+                        heapq.heappop(self._heap)
+                        continue
+                    delay = when - self.clock()
+                    if delay <= 0:
+                        heapq.heappop(self._heap)
+                        break
+                    self._cond.wait(delay)
+                else:
+                    return
+
+            if handle.cancelled:
+                continue
+            if self.jitter is not None:
+                self.jitter.add(self.clock() - handle.when)
+            try:
+                handle.fn(*handle.args)
+            except Exception as e:
+                if self._log:
+                    self._log(f"[ERRO] Timer: {e}")
+
+
+class VirtualScheduler:
+    # Mesmo contrato do Scheduler, mas o tempo só anda com advance(): torna
+    # determinísticos os testes e benchmarks de gestos e o replay
+    def __init__(self, start=0.0):
+        self.now = start
+        self._heap = []
+        self._seq = count()
+
+    def clock(self):
+        return self.now
+
+    def start(self):
+        pass
+
+    def stop(self):
+        self._heap.clear()
+
+    def schedule(self, delay, fn, *args):
+        return self.schedule_at(self.now + delay, fn, *args)
+
+    def schedule_at(self, when, fn, *args):
+        handle = TimerHandle(when, fn, args)
+        heapq.heappush(self._heap, (when, next(self._seq), handle))
+        return handle
+
+    def advance(self, to):
+        # Dispara, em ordem, tudo o que vence até "to"
+        heap = self._heap
+        while heap and heap[0][0] <= to:
+            when, _, handle = heapq.heappop(heap)
+            if handle.cancelled:
+                continue
+            self.now = max(self.now, when)
+            handle.fn(*handle.args)
+        self.now = max(self.now, to)
@@ -0,0 +1,114 @@
+# slides.py
+#
+# Detecção de troca de slide por hash perceptual (dHash) e camadas de
+# anotação por slide, com LRU limitado por memória para as versões
+# rasterizadas. Sem dependência de Qt: roda também no processo de captura.
+
+from collections import OrderedDict
+
+import numpy as np
+
+HASH_COLS = 9
+HASH_ROWS = 8
+# Amostragem antes da média por bloco; mantém o hash em poucos ms em 4K
+SAMPLE_STEP = 8
+# Distância de Hamming máxima para considerar o mesmo slide (de 64 bits)
+MATCH_DISTANCE = 6
+DEFAULT_MEMORY_CAP = 64 * 1024 * 1024
+MAX_LAYERS = 256
+
+
+def perceptual_hash(width, height, data, stride=None):
+    stride = stride or width * 4
+    pixels = np.frombuffer(data, dtype=np.uint8, count=stride * height)
+    pixels = pixels.reshape(height, stride // 4, 4)[::SAMPLE_STEP, :width:SAMPLE_STEP]
+
+    # BGRA → luminância aproximada em inteiros
+    gray = (
+        pixels[..., 0].astype(np.uint16) * 29
+        + pixels[..., 1].astype(np.uint16) * 150
+        + pixels[..., 2].astype(np.uint16) * 77
+    ) >> 8
+
+    h, w = gray.shape
+    bh, bw = h // HASH_ROWS, w // HASH_COLS
+    if bh == 0 or bw == 0:
+        return 0
+    blocks = (
+        gray[: bh * HASH_ROWS, : bw * HASH_COLS]
+        .reshape(HASH_ROWS, bh, HASH_COLS, bw)
+        .mean(axis=(1, 3))
+    )
+    bits = (blocks[:, 1:] > blocks[:, :-1]).ravel()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+class SlideLayer:
+    __slots__ = ("paths", "raster", "raster_bytes")
+
+    def __init__(self, paths, raster=None, raster_bytes=0):
+        self.paths = paths
+        self.raster = raster
+        self.raster_bytes = raster_bytes
+
+
+class AnnotationLayers:
+    def __init__(self, memory_cap=DEFAULT_MEMORY_CAP, max_layers=MAX_LAYERS):
+        self.memory_cap = memory_cap
+        self.max_layers = max_layers
+        self._layers = OrderedDict()  # hash → SlideLayer, mais recente no fim
+        self._raster_bytes = 0
+
+    def __len__(self):
+        return len(self._layers)
+
+    def __bool__(self):
+        return bool(self._layers)
+
+    @property
+    def raster_bytes(self):
+        return self._raster_bytes
+
+    def find(self, slide_hash):
+        if slide_hash in self._layers:
+            return slide_hash
+        best, best_distance = None, MATCH_DISTANCE + 1
+        for key in self._layers:
+            distance = hamming(key, slide_hash)
+            if distance < best_distance:
+                best, best_distance = key, distance
+        return best
+
+    def store(self, slide_hash, paths, raster=None, raster_bytes=0):
+        self.take(slide_hash)
+        if not paths:
+            return
+        self._layers[slide_hash] = SlideLayer(paths, raster, raster_bytes)
+        self._raster_bytes += raster_bytes if raster is not None else 0
+        self._evict()
+
+    def take(self, slide_hash):
+        layer = self._layers.pop(slide_hash, None)
+        if layer is not None and layer.raster is not None:
+            self._raster_bytes -= layer.raster_bytes
+        return layer
+
+    def clear(self):
+        self._layers.clear()
+        self._raster_bytes = 0
+
+    def _evict(self):
+        # Primeiro descarta só a versão rasterizada dos slides menos recentes;
+        # os traços continuam guardados e são rasterizados de novo ao voltar
+        for layer in self._layers.values():
+            if self._raster_bytes <= self.memory_cap:
+                break
+            if layer.raster is not None:
+                layer.raster = None
+                self._raster_bytes -= layer.raster_bytes
+        while len(self._layers) > self.max_layers:
+            self.take(next(iter(self._layers)))
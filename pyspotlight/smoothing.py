@@ -0,0 +1,84 @@
+# smoothing.py
+#
+# Filtro One-Euro (Casiez et al., 2012) para o movimento repassado: corte
+# baixo quando o ponteiro quase para (some o tremor do giroscópio) e alto
+# quando anda rápido (sem o atraso de uma média móvel). Estado O(1) por eixo.
+# Ativado por perfil, seção [smoothing]. Com a mão parada o filtro não recebe
+# relatórios: o dispositivo chama settle() em passos de SETTLE_INTERVAL, após
+# SETTLE_DELAY sem movimento, até a saída alcançar a posição real.
+
+import math
+
+SETTLE_DELAY = 0.02  # acima do intervalo de relatório de 100-125 Hz
+SETTLE_INTERVAL = 0.008
+
+
+class OneEuroFilter:
+    __slots__ = ("min_cutoff", "beta", "d_cutoff", "value", "speed", "time")
+
+    def __init__(self, min_cutoff=1.0, beta=0.01, d_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.value = None
+        self.speed = 0.0
+        self.time = None
+
+    @staticmethod
+    def _alpha(dt, cutoff):
+        tau = 1.0 / (2 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def __call__(self, value, timestamp):
+        if self.value is None:
+            self.value = value
+            self.time = timestamp
+            return value
+        dt = timestamp - self.time
+        if dt <= 0:
+            dt = 1e-3  # vários relatórios com o mesmo timestamp
+        self.time = timestamp
+
+        speed = (value - self.value) / dt
+        self.speed += self._alpha(dt, self.d_cutoff) * (speed - self.speed)
+        cutoff = self.min_cutoff + self.beta * abs(self.speed)
+        self.value += self._alpha(dt, cutoff) * (value - self.value)
+        return self.value
+
+
+class MotionSmoother:
+    # REL_X/REL_Y são deltas: filtra a posição integrada e devolve o delta
+    # inteiro até a posição filtrada, sem perder o resto entre frames
+    __slots__ = ("_x", "_y", "_raw", "_out")
+
+    def __init__(self, min_cutoff=1.0, beta=0.01, d_cutoff=1.0):
+        self._x = OneEuroFilter(min_cutoff, beta, d_cutoff)
+        self._y = OneEuroFilter(min_cutoff, beta, d_cutoff)
+        self._raw = [0, 0]
+        self._out = [0, 0]
+
+    def filter(self, dx, dy, timestamp):
+        raw = self._raw
+        out = self._out
+        raw[0] += dx
+        raw[1] += dy
+        x = round(self._x(raw[0], timestamp))
+        y = round(self._y(raw[1], timestamp))
+        dx, dy = x - out[0], y - out[1]
+        out[0], out[1] = x, y
+        return dx, dy
+
+    def pending(self):
+        return self._raw != self._out
+
+    def settle(self, timestamp):
+        # Um passo sem movimento novo; quando o passo arredonda para zero,
+        # entrega o resto de uma vez. Devolve (dx, dy, falta mais)
+        dx, dy = self.filter(0, 0, timestamp)
+        if not (dx or dy):
+            raw = self._raw
+            out = self._out
+            dx, dy = raw[0] - out[0], raw[1] - out[1]
+            out[0], out[1] = raw
+            self._x.value, self._y.value = float(raw[0]), float(raw[1])
+        return dx, dy, self.pending()
@@ -1,8 +1,8 @@
 import os
 import time
 import configparser
-from distutils.util import strtobool
-from PyQt5.QtWidgets import QApplication, QWidget
+from collections import deque
+from PyQt5.QtWidgets import QWidget
 from PyQt5.QtGui import (
     QPainter,
     QColor,
@@ -12,17 +12,17 @@ from PyQt5.QtGui import (
     QPen,
     QBrush,
 )
-from PyQt5.QtCore import Qt, QRect, QTimer, QPointF, QRectF, QPoint
+from PyQt5.QtCore import Qt, QRect, QTimer, QPointF, QRectF, QPoint, pyqtSignal
 
 from .utils import (
     MODE_MAP,
-    capture_monitor_screenshot,
     MODE_SPOTLIGHT,
     MODE_PEN,
     MODE_LASER,
     MODE_MAG_GLASS,
     MODE_MOUSE,
 )
+from .slides import AnnotationLayers
 
 
 DEBUG = True
@@ -30,9 +30,92 @@ DEBUG = True
 
 CONFIG_PATH = os.path.expanduser("~/.config/pyspotlight/config.ini")
 
+# Tempo para a transição do slide terminar antes de calcular o hash
+SLIDE_SETTLE_DELAY = 0.25
+
+# Comandos vindos dos dispositivos que podem ser fundidos no mesmo frame:
+# os acumulativos somam o passo no mesmo sentido (dez +1 viram um +10), os
+# idempotentes repetidos em sequência rodam uma vez só
+ACCUMULATIVE_COMMANDS = {
+    "change_spot_radius",
+    "change_laser_size",
+    "change_line_width",
+    "next_laser_color",
+    "next_pen_color",
+}
+IDEMPOTENT_COMMANDS = {
+    "show_overlay",
+    "hide_overlay",
+    "auto_show_overlay",
+    "auto_hide_overlay",
+    "set_spotlight_mode",
+    "set_mouse_mode",
+    "set_laser_mode",
+    "set_pen_mode",
+    "set_overlay_color_white",
+    "set_overlay_color_black",
+}
+# Somados componente a componente: (dx, dy) de vários eventos viram um só
+VECTOR_COMMANDS = {"move_pointer"}
+
+
+class Pointer:
+    # Estado de um apresentador: cada dispositivo tem modo, cor, tamanhos e
+    # posição próprios. O principal segue o cursor do sistema (x/y sem uso)
+    __slots__ = (
+        "id",
+        "mode",
+        "last_pointer_mode",
+        "laser_index",
+        "laser_size",
+        "spot_radius",
+        "x",
+        "y",
+    )
+
+    def __init__(self, pointer_id=None):
+        self.id = pointer_id
+        self.mode = MODE_MOUSE
+        self.last_pointer_mode = MODE_SPOTLIGHT
+        self.laser_index = 0
+        self.laser_size = 10
+        self.spot_radius = 150
+        self.x = self.y = 0
+
+    def copy(self, pointer_id, x, y):
+        # Ponteiro novo herda cor e tamanhos, mas começa no modo mouse
+        pointer = Pointer(pointer_id)
+        pointer.last_pointer_mode = self.last_pointer_mode
+        pointer.laser_index = self.laser_index
+        pointer.laser_size = self.laser_size
+        pointer.spot_radius = self.spot_radius
+        pointer.x, pointer.y = x, y
+        return pointer
+
+
+# Ponteiro de um dispositivo que ainda não enviou comandos
+_IDLE_POINTER = Pointer()
+
+
+def _pointer_attr(name):
+    # Atributo do ponteiro corrente: os métodos do overlay seguem usando
+    # self.mode, self.laser_index etc. sem saber de qual dispositivo são
+    return property(
+        lambda self: getattr(self._pointer, name),
+        lambda self, value: setattr(self._pointer, name, value),
+    )
+
 
 class SpotlightOverlayWindow(QWidget):
-    def __init__(self, context, screenshot, screen_geometry, monitor_index):
+    slide_key_pressed = pyqtSignal()
+
+    mode = _pointer_attr("mode")
+    last_pointer_mode = _pointer_attr("last_pointer_mode")
+    laser_index = _pointer_attr("laser_index")
+    laser_size = _pointer_attr("laser_size")
+    spot_radius = _pointer_attr("spot_radius")
+
+    def __init__(self, context, screen_geometry, monitor_index):
         super().__init__()
 
         self._ctx = context
@@ -48,10 +131,17 @@ class SpotlightOverlayWindow(QWidget):
         self.setAttribute(Qt.WA_TransparentForMouseEvents)
         self.setCursor(Qt.BlankCursor)
 
+        self._primary = Pointer()
+        self._pointer = self._primary  # alvo dos comandos em execução
+        self._pointers = {}  # id → Pointer dos demais dispositivos
+
         self.mode = MODE_MOUSE
         self.last_pointer_mode = MODE_SPOTLIGHT
 
         self._auto_mode_enabled = True
+        # Overlay ligado do ponto de vista do usuário; não muda nas ocultações
+        # momentâneas da captura de tela (isVisible muda)
+        self._active = False
         self._always_take_screenshot = False
         self.mag_is_square = False
         self.mag_aspect_ratio = 0.65
@@ -92,33 +182,155 @@ class SpotlightOverlayWindow(QWidget):
         self.drawing = False  # Se está atualmente desenhando
         self.current_line_width = 3
 
+        # Camadas de anotação por slide
+        self.slide_layers = AnnotationLayers()
+        self.current_slide_hash = None
+        self._slide_seq = 0
+        self._slide_hash_future = None
+        self._orphan_layer = None
+
         self.setGeometry(screen_geometry)
+        self._ink = None  # traços concluídos, rasterizados
 
-        # self.pixmap = QPixmap.fromImage(screenshot)
+        self._pending_capture = None
         self.clear_pixmap()
 
         self.pen_color = self.pen_colors[self.pen_index]
 
         self.cursor_pos = None  # Usado para exibir a caneta
 
+        # Fila de comandos dos dispositivos, esvaziada uma vez por frame na
+        # thread da GUI (deque.append é atômico: produtores não travam)
+        self._commands = deque()
+
         self.timer = QTimer()
-        self.timer.timeout.connect(self.update)
+        self.timer.timeout.connect(self._on_frame)
         self.timer.start(16)
 
+        self.slide_key_pressed.connect(self._on_slide_key)
+
         self.center_screen = self.geometry().center()
         QCursor.setPos(self.center_screen)
 
+    def post(self, name, *args, **kwargs):
+        self.post_to(None, name, *args, **kwargs)
+
+    def post_to(self, pointer, name, *args, **kwargs):
+        # Pode ser chamado de qualquer thread; executa no próximo frame, com
+        # o ponteiro do dispositivo como corrente
+        self._commands.append((pointer, name, args, kwargs))
+
+    def _on_frame(self):
+        self.run_commands()
+        self.update()
+
+    def run_commands(self):
+        commands = self._commands
+        if not commands:
+            return
+
+        merged = []
+        while commands:
+            pointer, name, args, kwargs = commands.popleft()
+            if merged:
+                last_pointer, last_name, last_args, last_kwargs = merged[-1]
+                if (
+                    name == last_name
+                    and pointer == last_pointer
+                    and kwargs == last_kwargs
+                ):
+                    if name in IDEMPOTENT_COMMANDS and args == last_args:
+                        continue
+                    if name in VECTOR_COMMANDS:
+                        total = tuple(a + b for a, b in zip(last_args, args))
+                        merged[-1] = (pointer, name, total, kwargs)
+                        continue
+                    # Só passos no mesmo sentido: os handlers limitam a faixa,
+                    # e -1 seguido de +1 no mínimo não é o mesmo que nada.
+                    # 0 tem sentido próprio (reset)
+                    if (
+                        name in ACCUMULATIVE_COMMANDS
+                        and len(args) == len(last_args) == 1
+                        and args[0] * last_args[0] > 0
+                    ):
+                        total = last_args[0] + args[0]
+                        merged[-1] = (pointer, name, (total,), kwargs)
+                        continue
+            merged.append((pointer, name, args, kwargs))
+
+        try:
+            for pointer, name, args, kwargs in merged:
+                self._pointer = self._pointer_for(pointer, create=True)
+                try:
+                    getattr(self, name)(*args, **kwargs)
+                except Exception as e:
+                    self._ctx.log(f"[ERRO] Comando {name}: {e}")
+        finally:
+            self._pointer = self._primary
+
+    def _pointer_for(self, pointer_id, create=False):
+        if pointer_id is None or pointer_id == self._ctx.primary_pointer():
+            return self._primary
+        pointer = self._pointers.get(pointer_id)
+        if pointer is None:
+            if not create:
+                return _IDLE_POINTER
+            center = self.rect().center()
+            pointer = self._primary.copy(pointer_id, center.x(), center.y())
+            self._pointers[pointer_id] = pointer
+        return pointer
+
+    def _wants_overlay(self):
+        if self._primary.mode != MODE_MOUSE:
+            return True
+        return any(p.mode != MODE_MOUSE for p in self._pointers.values())
+
+    def move_pointer(self, dx, dy):
+        pointer = self._pointer
+        if pointer is self._primary:
+            return  # o principal anda com o cursor do sistema
+        pointer.x = min(max(pointer.x + dx, 0), self.width() - 1)
+        pointer.y = min(max(pointer.y + dy, 0), self.height() - 1)
+
+    def drop_pointer(self, pointer_id):
+        # Dispositivo removido. Se era o principal, o próximo assume o
+        # cursor do sistema e larga o ponteiro próprio
+        self._pointers.pop(pointer_id, None)
+        self._pointers.pop(self._ctx.primary_pointer(), None)
+        if self._active and not self._wants_overlay():
+            self.hide_overlay()
+
     def clear_pixmap(self):
         if self._always_take_screenshot:
             return
         self.pixmap = QPixmap(self.size())
         self.pixmap.fill(Qt.transparent)
 
-    def current_mode(self):
-        return self.mode
+    def current_mode(self, pointer=None):
+        return self._pointer_for(pointer).mode
+
+    def is_active(self, pointer=None):
+        # Para um ponteiro extra: overlay ligado e ele fora do modo mouse
+        if not self._active:
+            return False
+        p = self._pointer_for(pointer)
+        return p is self._primary or p.mode != MODE_MOUSE
+
+    def owns_motion(self, pointer=None):
+        # Movimento vai para o ponteiro próprio, não para o cursor do sistema
+        return self._pointer_for(pointer) is not self._primary and self.is_active(
+            pointer
+        )
+
+    def _set_active(self, active):
+        self._active = active
+        # Dispositivos decidem se precisam de grab para o novo estado
+        self._ctx.overlay_state_changed()
 
     def save_config(self):
         config = configparser.ConfigParser()
+        # Preserva as seções que não são do overlay, ex: [Performance]
+        config.read(CONFIG_PATH)
         config["General"] = {
             "last_mode": str(self.mode),
             "always_take_screenshot": str(self._always_take_screenshot),
@@ -154,22 +366,16 @@ class SpotlightOverlayWindow(QWidget):
 
         if "General" in config:
             self.mode = int(config["General"].get("last_mode", self.mode))
-            self._always_take_screenshot = bool(
-                strtobool(
-                    config["General"].get(
-                        "always_take_screenshot", str(self._always_take_screenshot)
-                    )
-                )
+            self._always_take_screenshot = config["General"].getboolean(
+                "always_take_screenshot", self._always_take_screenshot
             )
 
         if "Overlay" in config:
             self.spot_radius = int(
                 config["Overlay"].get("spot_radius", self.spot_radius)
             )
-            self.mag_is_square = bool(
-                strtobool(
-                    config["Overlay"].get("mag_is_square", str(self.mag_is_square))
-                )
+            self.mag_is_square = config["Overlay"].getboolean(
+                "mag_is_square", self.mag_is_square
             )
             self.zoom_factor = float(
                 config["Overlay"].get("zoom_factor", self.zoom_factor)
@@ -245,10 +451,13 @@ class SpotlightOverlayWindow(QWidget):
         self.switch_mode(direct_mode=MODE_PEN)
 
     def hide_overlay(self):
+        self._pending_capture = None
         self.clear_pixmap()
         self.hide()
+        self._set_active(False)
 
     def show_overlay(self):
+        self._set_active(self._wants_overlay())
         if self.mode == MODE_MAG_GLASS:
             if self.zoom_factor <= self.zoom_min:
                 self.zoom_factor = self.zoom_min
@@ -262,9 +471,21 @@ class SpotlightOverlayWindow(QWidget):
                 self.showFullScreen()
 
     def set_last_pointer_mode(self):
-        if self.last_pointer_mode in self._ctx.compatible_modes:
+        compatible = self._ctx.compatible_modes_for(self._pointer.id)
+        if self.last_pointer_mode in compatible:
             self.switch_mode(direct_mode=self.last_pointer_mode)
 
+    def toggle_auto_mode(self):
+        self.set_auto_mode(not self._auto_mode_enabled)
+
+    def auto_show_overlay(self):
+        if self._auto_mode_enabled:
+            self.show_overlay()
+
+    def auto_hide_overlay(self):
+        if self._auto_mode_enabled:
+            self.hide_overlay()
+
     def set_auto_mode(self, enable=True):
         if not self._ctx.support_auto_mode:
             return
@@ -277,7 +498,7 @@ class SpotlightOverlayWindow(QWidget):
             self._ctx.show_info(f"{MODE_MAP[self.mode]}")
 
     def switch_mode(self, step=1, direct_mode=-1):
-        compatible = self._ctx.compatible_modes
+        compatible = self._ctx.compatible_modes_for(self._pointer.id)
         all_modes = list(MODE_MAP.keys())  # usa ordem de definição dos modos
 
         if not compatible:
@@ -319,10 +540,15 @@ class SpotlightOverlayWindow(QWidget):
         self._ctx.show_info(f"Modo {MODE_MAP[self.mode]}")
 
         if self.auto_mode_enabled():
+            self._ctx.overlay_state_changed()
             return
 
-        if self.mode == MODE_MOUSE:
+        self._set_active(self._wants_overlay())
+
+        if not self._active:
             self.hide()
+        elif self.mode == MODE_MOUSE:
+            pass  # outro ponteiro mantém o overlay
         elif self.mode == MODE_MAG_GLASS:
             if self.zoom_factor <= self.zoom_min:
                 self.zoom_factor = self.zoom_min
@@ -388,6 +614,7 @@ class SpotlightOverlayWindow(QWidget):
         if self.pen_paths:
             self.pen_paths.pop()  # Remove o último caminho desenhado
         self.current_path = []
+        self._ink = self.render_paths(self.pen_paths)
         self.update()
 
     def change_line_width(self, delta: int):
@@ -404,21 +631,33 @@ class SpotlightOverlayWindow(QWidget):
             self.current_line_width = new_width
             self.update()  # atualiza a tela para refletir a mudança, se necessário
 
-    def capture_screenshot(self):
+    def capture_screenshot(self, delay=0.5):
 
         # Esconde a janela overlay
         self.hide()
-        QApplication.processEvents()
-        time.sleep(0.5)  # aguardar atualização da tela
-
-        # Captura a tela limpa usando seu método externo
-        qimage, rect = capture_monitor_screenshot(self.monitor_index)
 
-        # Atualiza o pixmap do overlay (converter QImage para QPixmap)
-        self.pixmap = QPixmap.fromImage(qimage)
+        # Captura e conversão rodam no processo de captura; aguardar a
+        # atualização da tela também fica por conta dele
+        future = self._ctx.capture_service.request(self.monitor_index, delay=delay)
+        self._pending_capture = future
+        future.add_done_callback(self._on_screenshot_ready)
+        return future
+
+    def _on_screenshot_ready(self, future):
+        if future is not self._pending_capture:
+            return  # overlay foi ocultado ou outra captura foi pedida
+        self._pending_capture = None
+
+        try:
+            frame = future.result()
+            # Atualiza o pixmap do overlay (único trabalho na thread da GUI)
+            self.pixmap = frame.to_pixmap()
+        except Exception as e:
+            self._ctx.log(f"[ERRO] Falha ao capturar a tela: {e}")
 
         # Mostra a janela overlay novamente
         self.showFullScreen()
+        self.update()
 
     def drawMagnifyingGlass(self, painter, cursor_pos):
         radius = self.spot_radius
@@ -537,14 +776,24 @@ class SpotlightOverlayWindow(QWidget):
     #     else:
     #         painter.drawRect(dest_rect)
     #
-    def drawSpotlight(self, painter, cursor_pos):
-        # Spotlight tradicional com overlay escuro
+    def drawSpotlight(self, painter, spots):
+        # Spotlight tradicional com overlay escuro: um só caminho com um furo
+        # por ponteiro, (posição, raio), desenhado uma vez
         painter.setBrush(self.overlay_color)
         painter.setPen(Qt.NoPen)
 
         spotlight_path = QPainterPath()
         spotlight_path.addRect(QRectF(self.rect()))
-        spotlight_path.addEllipse(cursor_pos, self.spot_radius, self.spot_radius)
+        if len(spots) == 1:
+            cursor_pos, radius = spots[0]
+            spotlight_path.addEllipse(cursor_pos, radius, radius)
+        else:
+            # Furos sobrepostos não podem se anular (regra par-ímpar)
+            holes = QPainterPath()
+            holes.setFillRule(Qt.WindingFill)
+            for cursor_pos, radius in spots:
+                holes.addEllipse(QPointF(cursor_pos), radius, radius)
+            spotlight_path = spotlight_path.subtracted(holes)
 
         painter.setRenderHint(QPainter.Antialiasing)
         painter.drawPath(spotlight_path)
@@ -615,22 +864,12 @@ class SpotlightOverlayWindow(QWidget):
             painter.setPen(Qt.NoPen)
             painter.drawEllipse(center_x, center_y, size, size)
 
-    def drawLines(self, painter, cursor_pos):
+    def drawLines(self, painter):
         painter.setRenderHint(QPainter.Antialiasing)
 
-        # Desenha paths antigos
-        for path in self.pen_paths:
-            pen = QPen(
-                path["color"],
-                path["width"],
-                Qt.SolidLine,
-                Qt.RoundCap,
-                Qt.RoundJoin,
-            )
-            painter.setPen(pen)
-            if len(path["points"]) > 1:
-                for i in range(len(path["points"]) - 1):
-                    painter.drawLine(path["points"][i], path["points"][i + 1])
+        # Desenha paths antigos (já rasterizados)
+        if self._ink is not None:
+            painter.drawPixmap(0, 0, self._ink)
 
         # Desenha o path atual (se estiver desenhando)
         if self.drawing and len(self.current_path) > 1:
@@ -645,25 +884,48 @@ class SpotlightOverlayWindow(QWidget):
             for i in range(len(self.current_path) - 1):
                 painter.drawLine(self.current_path[i], self.current_path[i + 1])
 
-        cursor_pos = self.mapFromGlobal(QCursor.pos())
+    def drawPenTip(self, painter, cursor_pos):
         brush = QBrush(self.pen_color)
         painter.setBrush(brush)
         painter.setPen(Qt.NoPen)
         self.draw_pen_tip(painter, cursor_pos, size=self.current_line_width * 4)
 
+    def visible_pointers(self):
+        # (ponteiro, posição na janela) de quem está fora do modo mouse
+        pointers = []
+        if self._primary.mode != MODE_MOUSE:
+            pointers.append((self._primary, self.mapFromGlobal(QCursor.pos())))
+        for pointer in self._pointers.values():
+            if pointer.mode != MODE_MOUSE:
+                pointers.append((pointer, QPoint(int(pointer.x), int(pointer.y))))
+        return pointers
+
     def paintEvent(self, event):
         painter = QPainter(self)
-        cursor_pos = self.mapFromGlobal(QCursor.pos())
         # Fundo: sempre desenha o screenshot completo
         painter.drawPixmap(0, 0, self.pixmap)
-        if self.mode == MODE_SPOTLIGHT:
-            self.drawSpotlight(painter, cursor_pos)
-        elif self.mode == MODE_LASER:
-            self.drawLaser(painter, cursor_pos)
-        elif self.mode == MODE_PEN:
-            self.drawLines(painter, cursor_pos)
-        elif self.mode == MODE_MAG_GLASS:
-            self.drawMagnifyingGlass(painter, cursor_pos)
+
+        # Uma passada para todos os ponteiros: o escurecimento e a tinta são
+        # desenhados uma vez; por ponteiro, só o que é dele
+        pointers = self.visible_pointers()
+        spots = [
+            (pos, p.spot_radius) for p, pos in pointers if p.mode == MODE_SPOTLIGHT
+        ]
+        if spots:
+            self.drawSpotlight(painter, spots)
+        if any(p.mode == MODE_PEN for p, _ in pointers):
+            self.drawLines(painter)
+        try:
+            for pointer, cursor_pos in pointers:
+                self._pointer = pointer
+                if pointer.mode == MODE_LASER:
+                    self.drawLaser(painter, cursor_pos)
+                elif pointer.mode == MODE_PEN:
+                    self.drawPenTip(painter, cursor_pos)
+                elif pointer.mode == MODE_MAG_GLASS:
+                    self.drawMagnifyingGlass(painter, cursor_pos)
+        finally:
+            self._pointer = self._primary
 
     def draw_pen_tip(self, painter, pos, size=20):
         # Pontos do SVG com a ponta em (0, 0)
@@ -695,23 +957,149 @@ class SpotlightOverlayWindow(QWidget):
         painter.setPen(Qt.NoPen)
         painter.drawPath(path)
 
+    def draw_path(self, painter, path):
+        pen = QPen(
+            path["color"],
+            path["width"],
+            Qt.SolidLine,
+            Qt.RoundCap,
+            Qt.RoundJoin,
+        )
+        painter.setPen(pen)
+        points = path["points"]
+        for i in range(len(points) - 1):
+            painter.drawLine(points[i], points[i + 1])
+
+    def render_paths(self, paths, pixmap=None):
+        if not paths:
+            return None
+        if pixmap is None:
+            pixmap = QPixmap(self.size())
+            pixmap.fill(Qt.transparent)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing)
+        for path in paths:
+            self.draw_path(painter, path)
+        painter.end()
+        return pixmap
+
     def start_pen_path(self):
         self.drawing = True
         self.current_path = []
+        if self.current_slide_hash is None and self._slide_hash_future is None:
+            # Primeiro traço neste slide: identifica o slide antes da tinta
+            self.request_slide_hash(delay=0)
 
     def finish_pen_path(self):
         if len(self.current_path) > 1:
-            self.pen_paths.append(
-                {
-                    "points": self.current_path[:],
-                    "color": self.pen_color,
-                    "width": self.current_line_width,
-                }
-            )
+            path = {
+                "points": self.current_path[:],
+                "color": self.pen_color,
+                "width": self.current_line_width,
+            }
+            self.pen_paths.append(path)
+            self._ink = self.render_paths([path], self._ink)
         self.current_path = []
         self.drawing = False
         self.update()
 
+    def notify_slide_change(self):
+        # Pode ser chamado das threads dos dispositivos
+        self.slide_key_pressed.emit()
+
+    def _on_slide_key(self):
+        # Hash ainda pendente é do slide anterior: não vale para o novo
+        self._slide_seq += 1
+        if not self.pen_paths and not self.slide_layers:
+            self.current_slide_hash = None
+            self._slide_hash_future = None
+            return
+
+        if self.pen_paths:
+            if self.current_slide_hash is not None:
+                self.store_slide_layer(self.current_slide_hash)
+                self.pen_paths, self._ink = [], None
+            elif self._slide_hash_future is not None:
+                # Hash do slide anterior ainda não chegou; guarda até chegar
+                self._orphan_layer = (self._slide_seq - 1, self.pen_paths, self._ink)
+                self.pen_paths, self._ink = [], None
+            # Hash do slide anterior falhou: a tinta fica na tela
+        self.current_slide_hash = None
+        self.update()
+        self.request_slide_hash(delay=SLIDE_SETTLE_DELAY)
+
+    def store_slide_layer(self, slide_hash, paths=None, ink=None):
+        if paths is None:
+            paths, ink = self.pen_paths, self._ink
+        raster_bytes = ink.width() * ink.height() * 4 if ink is not None else 0
+        self.slide_layers.store(slide_hash, paths, ink, raster_bytes)
+
+    def request_slide_hash(self, delay):
+        seq = self._slide_seq
+        if not (self._always_take_screenshot and self._active):
+            future = self._ctx.capture_service.request_hash(self.monitor_index, delay)
+            future.add_done_callback(lambda f: self._on_slide_hash(f, seq))
+        elif delay:
+            # O overlay cobre a tela com o pixmap congelado, e o hash veria
+            # o slide anterior: captura de novo e tira o hash do frame
+            future = self.capture_screenshot(delay)
+            future.add_done_callback(lambda f: self._on_slide_hash(f, seq, True))
+        else:
+            from .capture import pixmap_hash  # só no modo screenshot
+
+            # Sem troca de slide pendente o pixmap congelado é o slide atual
+            self._set_slide_hash(pixmap_hash(self.pixmap), seq)
+            return
+        self._slide_hash_future = future
+
+    def _on_slide_hash(self, future, seq, from_frame=False):
+        if future is self._slide_hash_future:
+            self._slide_hash_future = None
+        try:
+            slide_hash = future.result()
+            if from_frame:
+                slide_hash = slide_hash.perceptual_hash()
+        except Exception as e:
+            self._ctx.log(f"[ERRO] Falha ao identificar o slide: {e}")
+            self._keep_orphan_layer(seq)
+            return
+        self._set_slide_hash(slide_hash, seq)
+
+    def _keep_orphan_layer(self, seq):
+        # Sem hash do slide anterior a tinta dele não tem onde ser guardada:
+        # continua na tela em vez de se perder
+        if not self._orphan_layer or self._orphan_layer[0] != seq:
+            return
+        _, paths, _ = self._orphan_layer
+        self._orphan_layer = None
+        self.pen_paths = paths + self.pen_paths
+        self._ink = self.render_paths(self.pen_paths)
+        self.update()
+
+    def _set_slide_hash(self, slide_hash, seq):
+        if self._orphan_layer and self._orphan_layer[0] == seq:
+            _, paths, ink = self._orphan_layer
+            self._orphan_layer = None
+            self.store_slide_layer(slide_hash, paths, ink)
+            return
+        if seq != self._slide_seq:
+            return  # outro slide já foi pedido
+
+        key = self.slide_layers.find(slide_hash)
+        if key is not None:
+            # Voltou a um slide anotado: restaura a tinta
+            layer = self.slide_layers.take(key)
+            new_paths = self.pen_paths
+            self.pen_paths = layer.paths + new_paths
+            self._ink = layer.raster
+            if self._ink is None:
+                self._ink = self.render_paths(layer.paths)
+            if new_paths:
+                self._ink = self.render_paths(new_paths, self._ink)
+            slide_hash = key
+        self.current_slide_hash = slide_hash
+        self.update()
+
     def handle_draw_command(self, command):
         match command:
             case "start_move":
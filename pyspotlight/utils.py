@@ -1,7 +1,12 @@
-import mss
-from PIL import Image
+import os
+import time
+import hashlib
+import configparser
+from collections import namedtuple
+
 from PyQt5.QtGui import (
     QImage,
+    QGuiApplication,
 )
 from PyQt5.QtCore import QRect
 
@@ -22,24 +27,249 @@ MODE_MAP = {
 }
 
 
-def pil_to_qimage(pil_img):
-    pil_img = pil_img.convert("RGBA")
-    data = pil_img.tobytes("raw", "RGBA")
-    return QImage(data, pil_img.width, pil_img.height, QImage.Format_RGBA8888)
+CAPTURE_CACHE_PATH = os.path.expanduser("~/.cache/pyspotlight/capture.ini")
+CAPTURE_BENCH_ROUNDS = 3
+
+Monitor = namedtuple("Monitor", "x y width height is_primary")
+
+
+class CaptureBackend:
+    NAME = None
+
+    def monitors(self):
+        raise NotImplementedError
+
+    def grab(self, monitor_index):
+        # Retorna (largura, altura, buffer) no layout de QImage.Format_RGB32
+        raise NotImplementedError
 
+    def close(self):
+        pass
 
-def capture_monitor_screenshot(monitor_index):
-    with mss.mss() as sct:
-        monitors = sct.monitors
-        # monitor_index da GUI (0-based) → monitor_index para mss (1-based)
-        mss_index = monitor_index + 1
+    def monitor(self, monitor_index):
+        monitors = self.monitors()
+        if monitor_index < 0 or monitor_index >= len(monitors):
+            monitor_index = 0  # fallback para primeiro monitor real
+        return monitors[monitor_index]
 
-        if mss_index < 1 or mss_index >= len(monitors):
-            mss_index = 1  # fallback para primeiro monitor real
+    def grab_qimage(self, monitor_index):
+        width, height, data = self.grab(monitor_index)
+        image = QImage(data, width, height, width * 4, QImage.Format_RGB32)
+        return image.copy()  # desacopla do buffer do backend
 
-        mon = monitors[mss_index]
-        sct_img = sct.grab(mon)
-        img = pil_to_qimage(
-            Image.frombytes("RGB", sct_img.size, sct_img.rgb).convert("RGBA")
+
+class MssCaptureBackend(CaptureBackend):
+    NAME = "mss"
+
+    def __init__(self):
+        import mss  # só quando a captura/enumeração é usada
+
+        self._sct = mss.mss()
+
+    def monitors(self):
+        # mss não informa o primário; assume o que está na origem
+        return [
+            Monitor(
+                m["left"],
+                m["top"],
+                m["width"],
+                m["height"],
+                m["left"] == 0 and m["top"] == 0,
+            )
+            for m in self._sct.monitors[1:]
+        ]
+
+    def grab(self, monitor_index):
+        m = self.monitor(monitor_index)
+        sct_img = self._sct.grab(
+            {"left": m.x, "top": m.y, "width": m.width, "height": m.height}
         )
-    return img, QRect(mon["left"], mon["top"], mon["width"], mon["height"])
+        return sct_img.width, sct_img.height, sct_img.raw
+
+    def close(self):
+        self._sct.close()
+
+
+class QtCaptureBackend(CaptureBackend):
+    # Só pode ser usado na thread da GUI, com QApplication criada
+    NAME = "qt"
+
+    def monitors(self):
+        primary = QGuiApplication.primaryScreen()
+        monitors = []
+        for screen in QGuiApplication.screens():
+            g = screen.geometry()
+            monitors.append(
+                Monitor(g.x(), g.y(), g.width(), g.height(), screen is primary)
+            )
+        return monitors
+
+    def grab(self, monitor_index):
+        screens = QGuiApplication.screens()
+        if monitor_index < 0 or monitor_index >= len(screens):
+            monitor_index = 0
+        image = screens[monitor_index].grabWindow(0).toImage()
+        if image.isNull():
+            raise RuntimeError("grabWindow não retornou imagem")
+        if image.format() != QImage.Format_RGB32:
+            image = image.convertToFormat(QImage.Format_RGB32)
+        data = image.constBits().asstring(image.sizeInBytes())
+        return image.width(), image.height(), data
+
+
+class XShmCaptureBackend(MssCaptureBackend):
+    # Enumeração de monitores vem do XRandR, via mss; a captura é XShm
+    NAME = "xshm"
+
+    def __init__(self, incremental=True):
+        from .xshm import DamageFrameCache, XShmGrabber
+
+        super().__init__()
+        self._cache = None
+        self._grabber = None
+        if incremental:
+            try:
+                self._cache = DamageFrameCache()
+            except Exception:
+                self._cache = None
+        if self._cache is None:
+            self._grabber = XShmGrabber()
+
+    def grab(self, monitor_index):
+        m = self.monitor(monitor_index)
+        if self._cache is not None:
+            frame = self._cache.frame(m.x, m.y, m.width, m.height)
+        else:
+            frame = self._grabber.grab(m.x, m.y, m.width, m.height)
+        height, width = frame.shape[:2]
+        return width, height, memoryview(frame).cast("B")
+
+    def close(self):
+        if self._cache is not None:
+            self._cache.close()
+        if self._grabber is not None:
+            self._grabber.close()
+        super().close()
+
+
+CAPTURE_BACKENDS = {
+    MssCaptureBackend.NAME: MssCaptureBackend,
+    QtCaptureBackend.NAME: QtCaptureBackend,
+    XShmCaptureBackend.NAME: XShmCaptureBackend,
+}
+
+_capture_backend = None
+
+
+def create_capture_backend(name, **kwargs):
+    return CAPTURE_BACKENDS[name](**kwargs)
+
+
+def get_capture_backend():
+    global _capture_backend
+    if _capture_backend is None:
+        _capture_backend = MssCaptureBackend()
+    return _capture_backend
+
+
+def get_monitors():
+    # Fonte única de monitores para a GUI, o overlay e a captura
+    return get_capture_backend().monitors()
+
+
+def display_config_key(monitors):
+    geometry = ";".join(f"{m.x},{m.y},{m.width}x{m.height}" for m in monitors)
+    return hashlib.sha1(geometry.encode()).hexdigest()[:12]
+
+
+def _time_backend(backend, monitors):
+    for i in range(len(monitors)):
+        backend.grab(i)  # aquecimento (conexões, buffers)
+    samples = []
+    for _ in range(CAPTURE_BENCH_ROUNDS):
+        start = time.perf_counter()
+        for i in range(len(monitors)):
+            backend.grab(i)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def benchmark_capture_backends(monitors, log=None):
+    timings = {}
+    for name, cls in CAPTURE_BACKENDS.items():
+        # XShm sem XDamage: compara o custo de uma captura inteira
+        kwargs = {"incremental": False} if cls is XShmCaptureBackend else {}
+        backend = None
+        try:
+            backend = cls(**kwargs)
+            timings[name] = _time_backend(backend, monitors)
+        except Exception as e:
+            if log:
+                log(f"* Captura: backend {name} indisponível ({e})")
+        finally:
+            if backend is not None:
+                backend.close()
+    return timings
+
+
+def select_capture_backend(log=None, force_benchmark=False, benchmark=True):
+    # Com benchmark=False e sem escolha salva para estes monitores, devolve
+    # None sem medir: quem chama mede depois (ver PySpotlight.start_services)
+    global _capture_backend
+
+    probe = MssCaptureBackend()
+    monitors = probe.monitors()
+    probe.close()
+    key = display_config_key(monitors)
+
+    config = configparser.ConfigParser()
+    config.read(CAPTURE_CACHE_PATH)
+
+    name = None
+    if not force_benchmark and key in config:
+        name = config[key].get("backend")
+        if log:
+            saved = ", ".join(
+                f"{n} {config[key][n]} ms" for n in CAPTURE_BACKENDS if n in config[key]
+            )
+            log(f"* Captura: usando {name} (escolha salva para {key}: {saved})")
+
+    if name not in CAPTURE_BACKENDS:
+        if not benchmark:
+            return None
+        timings = benchmark_capture_backends(monitors, log)
+        if not timings:
+            name = MssCaptureBackend.NAME
+        else:
+            name = min(timings, key=timings.get)
+            config[key] = {"backend": name}
+            config[key].update({n: f"{t * 1000:.2f}" for n, t in timings.items()})
+            os.makedirs(os.path.dirname(CAPTURE_CACHE_PATH), exist_ok=True)
+            with open(CAPTURE_CACHE_PATH, "w") as f:
+                config.write(f)
+        if log:
+            summary = ", ".join(f"{n} {t * 1000:.1f} ms" for n, t in timings.items())
+            log(f"* Captura: {summary} → {name}")
+
+    # A GUI só enumera monitores (a captura roda no CaptureService): XShm
+    # sem XDamage, ou os eventos de dano se acumulam nesta conexão
+    kwargs = {"incremental": False} if name == XShmCaptureBackend.NAME else {}
+    try:
+        backend = create_capture_backend(name, **kwargs)
+    except Exception as e:
+        if log:
+            log(f"* Captura: falha ao iniciar {name} ({e}), usando mss")
+        name = MssCaptureBackend.NAME
+        backend = MssCaptureBackend()
+
+    if _capture_backend is not None:
+        _capture_backend.close()
+    _capture_backend = backend
+    return name
+
+
+def monitor_geometry(monitor_index):
+    # Apenas a geometria, sem capturar a tela
+    m = get_capture_backend().monitor(monitor_index)
+    return QRect(m.x, m.y, m.width, m.height)
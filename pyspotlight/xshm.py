@@ -0,0 +1,440 @@
+# xshm.py
+#
+# Captura X11 via MIT-SHM com rastreamento de dano (XDamage): mantém um frame
+# persistente por monitor e recaptura somente os retângulos alterados.
+# Bindings via ctypes para não depender de python-xlib.
+
+import os
+import ctypes
+import ctypes.util
+from ctypes import (
+    POINTER,
+    Structure,
+    byref,
+    c_char_p,
+    c_int,
+    c_long,
+    c_short,
+    c_uint,
+    c_ulong,
+    c_ushort,
+    c_void_p,
+)
+
+import numpy as np
+
+ZPIXMAP = 2
+ALL_PLANES = 0xFFFFFFFFFFFFFFFF
+IPC_PRIVATE = 0
+IPC_CREAT = 0o1000
+IPC_RMID = 0
+X_DAMAGE_REPORT_RAW_RECTANGLES = 0
+X_DAMAGE_NOTIFY = 0
+
+# Acima desta fração da área do monitor, uma captura inteira sai mais barata
+FULL_GRAB_RATIO = 0.5
+MAX_RECTS = 16
+
+
+class XShmError(Exception):
+    pass
+
+
+class XImage(Structure):
+    _fields_ = [
+        ("width", c_int),
+        ("height", c_int),
+        ("xoffset", c_int),
+        ("format", c_int),
+        ("data", c_void_p),
+        ("byte_order", c_int),
+        ("bitmap_unit", c_int),
+        ("bitmap_bit_order", c_int),
+        ("bitmap_pad", c_int),
+        ("depth", c_int),
+        ("bytes_per_line", c_int),
+        ("bits_per_pixel", c_int),
+        ("red_mask", c_ulong),
+        ("green_mask", c_ulong),
+        ("blue_mask", c_ulong),
+        ("obdata", c_void_p),
+        ("funcs", c_void_p * 6),
+    ]
+
+
+class XShmSegmentInfo(Structure):
+    _fields_ = [
+        ("shmseg", c_ulong),
+        ("shmid", c_int),
+        ("shmaddr", c_void_p),
+        ("readOnly", c_int),
+    ]
+
+
+class XRectangle(Structure):
+    _fields_ = [
+        ("x", c_short),
+        ("y", c_short),
+        ("width", c_ushort),
+        ("height", c_ushort),
+    ]
+
+
+class XDamageNotifyEvent(Structure):
+    _fields_ = [
+        ("type", c_int),
+        ("serial", c_ulong),
+        ("send_event", c_int),
+        ("display", c_void_p),
+        ("drawable", c_ulong),
+        ("damage", c_ulong),
+        ("level", c_int),
+        ("more", c_int),
+        ("timestamp", c_ulong),
+        ("area", XRectangle),
+        ("geometry", XRectangle),
+    ]
+
+
+XEvent = c_long * 24
+
+XErrorHandler = ctypes.CFUNCTYPE(c_int, c_void_p, c_void_p)
+
+
+def _load_library(name):
+    path = ctypes.util.find_library(name)
+    if not path:
+        raise XShmError(f"Biblioteca {name} não encontrada")
+    return ctypes.CDLL(path)
+
+
+def _bind(lib, name, restype, argtypes):
+    func = getattr(lib, name)
+    func.restype = restype
+    func.argtypes = argtypes
+    return func
+
+
+class _Xlib:
+    _instance = None
+
+    @classmethod
+    def get(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def __init__(self):
+        x11 = _load_library("X11")
+        xext = _load_library("Xext")
+        libc = _load_library("c")
+
+        self.XOpenDisplay = _bind(x11, "XOpenDisplay", c_void_p, [c_char_p])
+        self.XCloseDisplay = _bind(x11, "XCloseDisplay", c_int, [c_void_p])
+        self.XDefaultScreen = _bind(x11, "XDefaultScreen", c_int, [c_void_p])
+        self.XDefaultRootWindow = _bind(x11, "XDefaultRootWindow", c_ulong, [c_void_p])
+        self.XDefaultVisual = _bind(x11, "XDefaultVisual", c_void_p, [c_void_p, c_int])
+        self.XDefaultDepth = _bind(x11, "XDefaultDepth", c_int, [c_void_p, c_int])
+        self.XDisplayWidth = _bind(x11, "XDisplayWidth", c_int, [c_void_p, c_int])
+        self.XDisplayHeight = _bind(x11, "XDisplayHeight", c_int, [c_void_p, c_int])
+        self.XSync = _bind(x11, "XSync", c_int, [c_void_p, c_int])
+        self.XPending = _bind(x11, "XPending", c_int, [c_void_p])
+        self.XNextEvent = _bind(x11, "XNextEvent", c_int, [c_void_p, c_void_p])
+        self.XDestroyImage = _bind(x11, "XDestroyImage", c_int, [POINTER(XImage)])
+        self.XSetErrorHandler = _bind(
+            x11, "XSetErrorHandler", c_void_p, [XErrorHandler]
+        )
+
+        self.XShmQueryExtension = _bind(xext, "XShmQueryExtension", c_int, [c_void_p])
+        self.XShmCreateImage = _bind(
+            xext,
+            "XShmCreateImage",
+            POINTER(XImage),
+            [
+                c_void_p,
+                c_void_p,
+                c_uint,
+                c_int,
+                c_void_p,
+                POINTER(XShmSegmentInfo),
+                c_uint,
+                c_uint,
+            ],
+        )
+        self.XShmAttach = _bind(
+            xext, "XShmAttach", c_int, [c_void_p, POINTER(XShmSegmentInfo)]
+        )
+        self.XShmDetach = _bind(
+            xext, "XShmDetach", c_int, [c_void_p, POINTER(XShmSegmentInfo)]
+        )
+        self.XShmGetImage = _bind(
+            xext,
+            "XShmGetImage",
+            c_int,
+            [c_void_p, c_ulong, POINTER(XImage), c_int, c_int, c_ulong],
+        )
+
+        self.shmget = _bind(libc, "shmget", c_int, [c_int, ctypes.c_size_t, c_int])
+        self.shmat = _bind(libc, "shmat", c_void_p, [c_int, c_void_p, c_int])
+        self.shmdt = _bind(libc, "shmdt", c_int, [c_void_p])
+        self.shmctl = _bind(libc, "shmctl", c_int, [c_int, c_int, c_void_p])
+
+        # O handler padrão do Xlib encerra o processo em qualquer erro
+        self.last_error = None
+        self._error_handler = XErrorHandler(self._on_error)
+        self.XSetErrorHandler(self._error_handler)
+
+        self._damage = None
+
+    def _on_error(self, display, event):
+        self.last_error = "X error"
+        return 0
+
+    @property
+    def damage(self):
+        if self._damage is None:
+            xdamage = _load_library("Xdamage")
+            self._damage = {
+                "query": _bind(
+                    xdamage,
+                    "XDamageQueryExtension",
+                    c_int,
+                    [c_void_p, POINTER(c_int), POINTER(c_int)],
+                ),
+                "create": _bind(
+                    xdamage, "XDamageCreate", c_ulong, [c_void_p, c_ulong, c_int]
+                ),
+                "destroy": _bind(xdamage, "XDamageDestroy", None, [c_void_p, c_ulong]),
+            }
+        return self._damage
+
+
+class XShmGrabber:
+    def __init__(self, display_name=None):
+        self._x = _Xlib.get()
+        name = display_name or os.environ.get("DISPLAY")
+        if not name:
+            raise XShmError("DISPLAY não definido")
+
+        self.display = self._x.XOpenDisplay(name.encode())
+        if not self.display:
+            raise XShmError(f"Não foi possível abrir o display {name}")
+
+        self._image = None
+        self._shminfo = XShmSegmentInfo()
+        try:
+            if not self._x.XShmQueryExtension(self.display):
+                raise XShmError("Extensão MIT-SHM indisponível")
+
+            screen = self._x.XDefaultScreen(self.display)
+            self.root = self._x.XDefaultRootWindow(self.display)
+            self.width = self._x.XDisplayWidth(self.display, screen)
+            self.height = self._x.XDisplayHeight(self.display, screen)
+            self._create_image(screen)
+        except Exception:
+            self.close()
+            raise
+
+    def _create_image(self, screen):
+        x = self._x
+        visual = x.XDefaultVisual(self.display, screen)
+        depth = x.XDefaultDepth(self.display, screen)
+        image = x.XShmCreateImage(
+            self.display,
+            visual,
+            depth,
+            ZPIXMAP,
+            None,
+            byref(self._shminfo),
+            self.width,
+            self.height,
+        )
+        if not image:
+            raise XShmError("XShmCreateImage falhou")
+        self._image = image
+        if image.contents.bits_per_pixel != 32:
+            raise XShmError(
+                f"Formato de pixel não suportado: {image.contents.bits_per_pixel} bpp"
+            )
+
+        size = image.contents.bytes_per_line * image.contents.height
+        shmid = x.shmget(IPC_PRIVATE, size, IPC_CREAT | 0o600)
+        if shmid < 0:
+            raise XShmError("shmget falhou")
+        self._shminfo.shmid = shmid
+        addr = x.shmat(shmid, None, 0)
+        if addr in (None, ctypes.c_void_p(-1).value):
+            x.shmctl(shmid, IPC_RMID, None)
+            raise XShmError("shmat falhou")
+        self._shminfo.shmaddr = addr
+        self._shminfo.readOnly = 0
+        image.contents.data = addr
+
+        x.last_error = None
+        if not x.XShmAttach(self.display, byref(self._shminfo)):
+            raise XShmError("XShmAttach falhou")
+        x.XSync(self.display, 0)
+        # Marca para remoção; o segmento some quando todos se desanexarem
+        x.shmctl(shmid, IPC_RMID, None)
+        if x.last_error:
+            raise XShmError("XShmAttach falhou (display remoto?)")
+
+        self._scratch = np.ctypeslib.as_array(
+            ctypes.cast(addr, POINTER(ctypes.c_uint8)), shape=(size,)
+        )
+
+    def grab(self, x, y, w, h):
+        # Usa o início do segmento como imagem w×h empacotada: o servidor grava
+        # só o retângulo pedido, sem copiar o monitor inteiro
+        img = self._image.contents
+        full_w, full_h, full_bpl = img.width, img.height, img.bytes_per_line
+        img.width, img.height, img.bytes_per_line = w, h, w * 4
+        try:
+            if not self._x.XShmGetImage(
+                self.display, self.root, self._image, x, y, ALL_PLANES
+            ):
+                raise XShmError(f"XShmGetImage falhou em {(x, y, w, h)}")
+        finally:
+            img.width, img.height, img.bytes_per_line = full_w, full_h, full_bpl
+        # Válido apenas até a próxima captura
+        return self._scratch[: w * h * 4].reshape(h, w, 4)
+
+    def close(self):
+        x = self._x
+        if self._image:
+            if self._shminfo.shmaddr:
+                x.XShmDetach(self.display, byref(self._shminfo))
+            # Para imagens XShm só libera a struct; o segmento sai no shmdt
+            x.XDestroyImage(self._image)
+            self._image = None
+        if self._shminfo.shmaddr:
+            x.shmdt(self._shminfo.shmaddr)
+            self._shminfo.shmaddr = None
+        if self.display:
+            x.XCloseDisplay(self.display)
+            self.display = None
+
+
+class DamageTracker:
+    def __init__(self, grabber):
+        self._x = _Xlib.get()
+        self._grabber = grabber
+        damage = self._x.damage
+
+        event_base = c_int()
+        error_base = c_int()
+        if not damage["query"](grabber.display, byref(event_base), byref(error_base)):
+            raise XShmError("Extensão DAMAGE indisponível")
+        self._notify_type = event_base.value + X_DAMAGE_NOTIFY
+        self._damage = damage["create"](
+            grabber.display, grabber.root, X_DAMAGE_REPORT_RAW_RECTANGLES
+        )
+        self._event = XEvent()
+        self._notify = ctypes.cast(byref(self._event), POINTER(XDamageNotifyEvent))
+
+    def pending(self):
+        x = self._x
+        display = self._grabber.display
+        rects = []
+        # Garante que todo dano até agora já chegou na fila de eventos
+        x.XSync(display, 0)
+        while x.XPending(display):
+            x.XNextEvent(display, byref(self._event))
+            ev = self._notify.contents
+            if ev.type == self._notify_type:
+                a = ev.area
+                rects.append((a.x, a.y, a.width, a.height))
+        return rects
+
+    def close(self):
+        if self._damage and self._grabber.display:
+            self._x.damage["destroy"](self._grabber.display, self._damage)
+        self._damage = None
+
+
+def _intersect(rect, bounds):
+    x, y, w, h = rect
+    bx, by, bw, bh = bounds
+    x1, y1 = max(x, bx), max(y, by)
+    x2, y2 = min(x + w, bx + bw), min(y + h, by + bh)
+    if x2 <= x1 or y2 <= y1:
+        return None
+    return (x1, y1, x2 - x1, y2 - y1)
+
+
+def merge_rects(rects, max_rects=MAX_RECTS):
+    # Junta retângulos que se tocam; se sobrar muitos, usa o envelope
+    merged = []
+    for rect in rects:
+        x, y, w, h = rect
+        changed = True
+        while changed:
+            changed = False
+            for i, (mx, my, mw, mh) in enumerate(merged):
+                if x <= mx + mw and mx <= x + w and y <= my + mh and my <= y + h:
+                    nx, ny = min(x, mx), min(y, my)
+                    w = max(x + w, mx + mw) - nx
+                    h = max(y + h, my + mh) - ny
+                    x, y = nx, ny
+                    del merged[i]
+                    changed = True
+                    break
+        merged.append((x, y, w, h))
+
+    if len(merged) > max_rects:
+        x1 = min(r[0] for r in merged)
+        y1 = min(r[1] for r in merged)
+        x2 = max(r[0] + r[2] for r in merged)
+        y2 = max(r[1] + r[3] for r in merged)
+        merged = [(x1, y1, x2 - x1, y2 - y1)]
+    return merged
+
+
+class DamageFrameCache:
+    def __init__(self, display_name=None):
+        self.grabber = XShmGrabber(display_name)
+        try:
+            self.tracker = DamageTracker(self.grabber)
+        except Exception:
+            self.grabber.close()
+            raise
+        self._frames = {}
+        self._dirty = {}
+        self.last_grabbed_area = 0
+
+    def frame(self, left, top, width, height):
+        key = (left, top, width, height)
+        bounds = _intersect(key, (0, 0, self.grabber.width, self.grabber.height))
+        if bounds is None:
+            raise XShmError(f"Monitor fora da tela: {key}")
+
+        for rect in self.tracker.pending():
+            for k in self._dirty:
+                clipped = _intersect(rect, k)
+                if clipped:
+                    self._dirty[k].append(clipped)
+
+        frame = self._frames.get(key)
+        if frame is None:
+            frame = np.zeros((height, width, 4), dtype=np.uint8)
+            self._frames[key] = frame
+            dirty = [bounds]
+        else:
+            dirty = merge_rects(self._dirty[key])
+        self._dirty[key] = []
+
+        area = sum(w * h for _, _, w, h in dirty)
+        if area >= FULL_GRAB_RATIO * width * height:
+            dirty = [bounds]
+            area = bounds[2] * bounds[3]
+
+        for x, y, w, h in dirty:
+            pixels = self.grabber.grab(x, y, w, h)
+            fx, fy = x - left, y - top
+            frame[fy : fy + h, fx : fx + w] = pixels
+        self.last_grabbed_area = area
+        return frame
+
+    def close(self):
+        self.tracker.close()
+        self.grabber.close()